@@ -0,0 +1,39 @@
+"""
+Compila ahead-of-time (numba.pycc) o stencil de 5 pontos especializado para a grade 200x200
+do exemplo `__main__`, gerando o módulo de extensão `_heat_aot` ao lado deste arquivo:
+
+    python _heat_aot_build.py
+
+Com a forma fixa em tempo de compilação, o LLVM conhece os limites dos laços: pode desenrolar o laço
+interno, dispensar o laço de resto da vetorização e não há despacho genérico nem compilação JIT no
+primeiro passo. `heat_diffusion_base.py` usa o módulo automaticamente em `_apply_stencil` se ele tiver sido compilado e a
+grade for 200x200 (float64 ou float32); nos demais casos, usa os kernels genéricos. Com numba instalado
+em tempo de execução, `solve` usa o laço fundido `_stencil_run` e não passa por `_apply_stencil`: o módulo
+só vale, então, para `solve_blocked`, ou num ambiente que recebeu o módulo compilado mas não tem numba.
+"""
+import os
+
+import numpy as np
+from numba.pycc import CC
+
+GRID_SIZE = 200
+
+cc = CC("_heat_aot")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+@cc.export("step_200_f64", "void(f8[:,::1], f8[:,::1], f8)")
+def step_200_f64(g, n, c):
+    """Stencil de 5 pontos nas células internas de uma grade 200x200 float64 (bordas de `n` intocadas)."""
+    for i in range(1, GRID_SIZE - 1):
+        for j in range(1, GRID_SIZE - 1):
+            n[i, j] = g[i, j] + c * (g[i-1, j] + g[i+1, j] + g[i, j-1] + g[i, j+1] - 4.0 * g[i, j])
+
+@cc.export("step_200_f32", "void(f4[:,::1], f4[:,::1], f4)")
+def step_200_f32(g, n, c):
+    """Mesmo kernel para float32, o tipo padrão das grades (com a constante também em float32)."""
+    for i in range(1, GRID_SIZE - 1):
+        for j in range(1, GRID_SIZE - 1):
+            n[i, j] = g[i, j] + c * (g[i-1, j] + g[i+1, j] + g[i, j-1] + g[i, j+1] - np.float32(4.0) * g[i, j])
+
+if __name__ == "__main__":
+    cc.compile()
@@ -0,0 +1,176 @@
+/*
+ * Kernels nativos do stencil de 5 pontos para a difusão de calor 2D (`step` em float64 e
+ * `step_f32` em float32).
+ *
+ * Carregado via ctypes por `heat_diffusion_base.py` quando a biblioteca compilada existe
+ * ao lado do módulo. Só é usado sem numba (ou por `solve_blocked`/`validate_dtype_precision`):
+ * com numba, o laço de tempo fundido `_stencil_run` é tão rápido quanto ele. Compilação (Linux/macOS):
+ *
+ *     gcc -O3 -ffast-math -shared -fPIC _heat_kernel.c -o _heat_kernel.so
+ *
+ * Sem -march=native: a mesma biblioteca roda em qualquer CPU x86-64. As versões AVX-512 e AVX2+FMA
+ * são compiladas lado a lado (atributo `target`) e escolhidas uma única vez, ao carregar a biblioteca,
+ * com `__builtin_cpu_supports`; sem nenhuma das duas (ou fora de x86), resta o laço escalar.
+ */
+#include <stddef.h>
+
+#if (defined(__x86_64__) || defined(__i386__)) && defined(__GNUC__)
+#define HEAT_KERNEL_X86 1
+#include <immintrin.h>
+#endif
+
+/* Laços escalares: o restante de cada linha nas versões vetoriais, ou a linha inteira sem AVX. */
+static void row_tail_f64(const double *up, const double *row, const double *down, double *out,
+                         int j, int W, double c)
+{
+    for (; j < W - 1; j++) {
+        out[j] = row[j] + c * (up[j] + down[j] + row[j - 1] + row[j + 1] - 4.0 * row[j]);
+    }
+}
+
+static void row_tail_f32(const float *up, const float *row, const float *down, float *out,
+                         int j, int W, float c, float c4)
+{
+    for (; j < W - 1; j++) {
+        out[j] = c4 * row[j] + c * (up[j] + down[j] + row[j - 1] + row[j + 1]);
+    }
+}
+
+static void step_scalar(const double *cur, double *nxt, int H, int W, double c)
+{
+    for (int i = 1; i < H - 1; i++) {
+        const double *row = cur + (size_t)i * W;
+        row_tail_f64(row - W, row, row + W, nxt + (size_t)i * W, 1, W, c);
+    }
+}
+
+static void step_f32_scalar(const float *cur, float *nxt, int H, int W, float c)
+{
+    const float c4 = 1.0f - 4.0f * c;
+    for (int i = 1; i < H - 1; i++) {
+        const float *row = cur + (size_t)i * W;
+        row_tail_f32(row - W, row, row + W, nxt + (size_t)i * W, 1, W, c, c4);
+    }
+}
+
+#ifdef HEAT_KERNEL_X86
+__attribute__((target("avx512f")))
+static void step_avx512(const double *cur, double *nxt, int H, int W, double c)
+{
+    const __m512d c_vec = _mm512_set1_pd(c);
+    const __m512d four = _mm512_set1_pd(4.0);
+    for (int i = 1; i < H - 1; i++) {
+        const double *up = cur + (size_t)(i - 1) * W;
+        const double *row = cur + (size_t)i * W;
+        const double *down = cur + (size_t)(i + 1) * W;
+        double *out = nxt + (size_t)i * W;
+        int j = 1;
+        for (; j + 8 <= W - 1; j += 8) {
+            __m512d center = _mm512_loadu_pd(row + j);
+            __m512d sum4 = _mm512_add_pd(_mm512_add_pd(_mm512_loadu_pd(up + j), _mm512_loadu_pd(down + j)),
+                                         _mm512_add_pd(_mm512_loadu_pd(row + j - 1), _mm512_loadu_pd(row + j + 1)));
+            _mm512_storeu_pd(out + j, _mm512_fmadd_pd(c_vec, _mm512_sub_pd(sum4, _mm512_mul_pd(four, center)), center));
+        }
+        row_tail_f64(up, row, down, out, j, W, c);
+    }
+}
+
+__attribute__((target("avx2,fma")))
+static void step_avx2(const double *cur, double *nxt, int H, int W, double c)
+{
+    const __m256d c_vec = _mm256_set1_pd(c);
+    const __m256d four = _mm256_set1_pd(4.0);
+    for (int i = 1; i < H - 1; i++) {
+        const double *up = cur + (size_t)(i - 1) * W;
+        const double *row = cur + (size_t)i * W;
+        const double *down = cur + (size_t)(i + 1) * W;
+        double *out = nxt + (size_t)i * W;
+        int j = 1;
+        for (; j + 4 <= W - 1; j += 4) {
+            __m256d center = _mm256_loadu_pd(row + j);
+            __m256d sum4 = _mm256_add_pd(_mm256_add_pd(_mm256_loadu_pd(up + j), _mm256_loadu_pd(down + j)),
+                                         _mm256_add_pd(_mm256_loadu_pd(row + j - 1), _mm256_loadu_pd(row + j + 1)));
+            _mm256_storeu_pd(out + j, _mm256_fmadd_pd(c_vec, _mm256_sub_pd(sum4, _mm256_mul_pd(four, center)), center));
+        }
+        row_tail_f64(up, row, down, out, j, W, c);
+    }
+}
+
+/* Versões float32, na forma fatorada c4 * centro + c * (N + S + O + L), com c4 = 1 - 4c. */
+__attribute__((target("avx512f")))
+static void step_f32_avx512(const float *cur, float *nxt, int H, int W, float c)
+{
+    const float c4 = 1.0f - 4.0f * c;
+    const __m512 c_vec = _mm512_set1_ps(c);
+    const __m512 c4_vec = _mm512_set1_ps(c4);
+    for (int i = 1; i < H - 1; i++) {
+        const float *up = cur + (size_t)(i - 1) * W;
+        const float *row = cur + (size_t)i * W;
+        const float *down = cur + (size_t)(i + 1) * W;
+        float *out = nxt + (size_t)i * W;
+        int j = 1;
+        for (; j + 16 <= W - 1; j += 16) {
+            __m512 sum4 = _mm512_add_ps(_mm512_add_ps(_mm512_loadu_ps(up + j), _mm512_loadu_ps(down + j)),
+                                        _mm512_add_ps(_mm512_loadu_ps(row + j - 1), _mm512_loadu_ps(row + j + 1)));
+            _mm512_storeu_ps(out + j, _mm512_fmadd_ps(c4_vec, _mm512_loadu_ps(row + j), _mm512_mul_ps(c_vec, sum4)));
+        }
+        row_tail_f32(up, row, down, out, j, W, c, c4);
+    }
+}
+
+__attribute__((target("avx2,fma")))
+static void step_f32_avx2(const float *cur, float *nxt, int H, int W, float c)
+{
+    const float c4 = 1.0f - 4.0f * c;
+    const __m256 c_vec = _mm256_set1_ps(c);
+    const __m256 c4_vec = _mm256_set1_ps(c4);
+    for (int i = 1; i < H - 1; i++) {
+        const float *up = cur + (size_t)(i - 1) * W;
+        const float *row = cur + (size_t)i * W;
+        const float *down = cur + (size_t)(i + 1) * W;
+        float *out = nxt + (size_t)i * W;
+        int j = 1;
+        for (; j + 8 <= W - 1; j += 8) {
+            __m256 sum4 = _mm256_add_ps(_mm256_add_ps(_mm256_loadu_ps(up + j), _mm256_loadu_ps(down + j)),
+                                        _mm256_add_ps(_mm256_loadu_ps(row + j - 1), _mm256_loadu_ps(row + j + 1)));
+            _mm256_storeu_ps(out + j, _mm256_fmadd_ps(c4_vec, _mm256_loadu_ps(row + j), _mm256_mul_ps(c_vec, sum4)));
+        }
+        row_tail_f32(up, row, down, out, j, W, c, c4);
+    }
+}
+#endif
+
+static void (*step_impl)(const double *, double *, int, int, double) = step_scalar;
+static void (*step_f32_impl)(const float *, float *, int, int, float) = step_f32_scalar;
+
+/* Escolhe as versões vetoriais suportadas pela CPU, uma vez, quando a biblioteca é carregada. */
+__attribute__((constructor))
+static void select_kernels(void)
+{
+#ifdef HEAT_KERNEL_X86
+    __builtin_cpu_init();
+    if (__builtin_cpu_supports("avx512f")) {
+        step_impl = step_avx512;
+        step_f32_impl = step_f32_avx512;
+    } else if (__builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma")) {
+        step_impl = step_avx2;
+        step_f32_impl = step_f32_avx2;
+    }
+#endif
+}
+
+/*
+ * Escreve em `nxt` o stencil aplicado às células internas de `cur` (ambas H x W, C-contíguas).
+ * As bordas de `nxt` não são escritas.
+ */
+void step(const double *cur, double *nxt, int H, int W, double c)
+{
+    step_impl(cur, nxt, H, W, c);
+}
+
+/* Mesmo stencil de `step` para grades float32. */
+void step_f32(const float *cur, float *nxt, int H, int W, float c)
+{
+    step_f32_impl(cur, nxt, H, W, c);
+}
+
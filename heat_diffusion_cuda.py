@@ -0,0 +1,156 @@
+
+import numpy as np
+import time
+
+from heat_diffusion_base import BaseHeatDiffusion
+
+# numba.cuda é opcional: sem ele (ou sem uma GPU CUDA), este solver não pode ser usado,
+# mas os demais módulos continuam funcionando normalmente.
+try:
+    import numba
+    from numba import cuda
+except ImportError:
+    cuda = None
+
+# Lado dos blocos de threads do kernel (BLOCK x BLOCK threads). Cada bloco carrega em memória
+# compartilhada um tile de (BLOCK + 2) x (BLOCK + 2) células: as suas mais uma célula de halo de cada lado.
+BLOCK = 16
+
+# Kernels já compilados, um por tipo de ponto flutuante (o tipo do tile compartilhado é fixo no kernel).
+_STEP_KERNELS = {}
+
+def _get_step_kernel(dtype):
+    """
+    Devolve o kernel CUDA do stencil para grades de tipo `dtype`, criando-o na primeira chamada.
+
+    Cada bloco copia seu tile (com os halos) da memória global para a memória compartilhada e
+    sincroniza; o stencil então lê os 5 pontos da memória compartilhada, de modo que cada célula
+    é lida da memória global uma única vez por bloco, e não 5 vezes.
+    """
+    dtype = np.dtype(dtype)
+    if dtype in _STEP_KERNELS:
+        return _STEP_KERNELS[dtype]
+    tile_dtype = numba.from_dtype(dtype)
+    four = dtype.type(4.0)
+
+    @cuda.jit
+    def step(cur, nxt, c, hot_r, hot_c, hot_t):
+        # x (threads consecutivos de um warp) percorre as colunas: os acessos à memória global são coalescidos.
+        j, i = cuda.grid(2)
+        tx = cuda.threadIdx.x + 1
+        ty = cuda.threadIdx.y + 1
+        H, W = cur.shape
+
+        tile = cuda.shared.array((BLOCK + 2, BLOCK + 2), dtype=tile_dtype)
+        if i < H and j < W:
+            tile[ty, tx] = cur[i, j]
+            # As threads da borda do bloco também carregam a célula de halo vizinha (se existir na grade).
+            if cuda.threadIdx.y == 0 and i > 0:
+                tile[0, tx] = cur[i - 1, j]
+            if cuda.threadIdx.y == BLOCK - 1 and i + 1 < H:
+                tile[BLOCK + 1, tx] = cur[i + 1, j]
+            if cuda.threadIdx.x == 0 and j > 0:
+                tile[ty, 0] = cur[i, j - 1]
+            if cuda.threadIdx.x == BLOCK - 1 and j + 1 < W:
+                tile[ty, BLOCK + 1] = cur[i, j + 1]
+        # Todas as threads do bloco precisam ter carregado o tile antes que qualquer uma o leia.
+        cuda.syncthreads()
+
+        # Só as células internas são atualizadas; as bordas (fixas) de `nxt` nunca são escritas.
+        if 1 <= i < H - 1 and 1 <= j < W - 1:
+            if i == hot_r and j == hot_c:
+                nxt[i, j] = hot_t
+            else:
+                center = tile[ty, tx]
+                nxt[i, j] = center + c * (tile[ty - 1, tx] + tile[ty + 1, tx] +
+                                          tile[ty, tx - 1] + tile[ty, tx + 1] - four * center)
+
+    _STEP_KERNELS[dtype] = step
+    return step
+
+class CudaHeatDiffusionSolver(BaseHeatDiffusion):
+    """
+    Resolve o problema de difusão de calor na GPU com numba.cuda.
+    As duas grades ficam residentes na memória da GPU durante toda a simulação: são copiadas
+    para o dispositivo uma vez no início e a grade final é copiada de volta uma vez no fim.
+    Cada passo de tempo é um único lançamento do kernel, com um thread por célula.
+    Compensa em grades grandes (da ordem de 1024x1024 ou mais), em que a largura de banda da
+    GPU supera a da CPU; em grades pequenas, o custo de cada lançamento domina.
+    """
+    def __init__(self, grid_size, initial_temp, boundary_temp, alpha, dt, dx, dtype=np.float32):
+        """
+        Inicializa o solver CUDA, chamando o construtor da classe base.
+
+        Raises:
+            RuntimeError: Se numba.cuda não estiver instalado ou nenhuma GPU CUDA estiver disponível.
+        """
+        if cuda is None or not cuda.is_available():
+            raise RuntimeError("CudaHeatDiffusionSolver requer numba com suporte a CUDA e uma GPU disponível.")
+        super().__init__(grid_size, initial_temp, boundary_temp, alpha, dt, dx, dtype)
+
+    def solve(self, num_iterations, hotspot_pos=None, hotspot_temp=None):
+        """
+        Executa a simulação de difusão de calor na GPU por um dado número de iterações.
+
+        Args:
+            num_iterations (int): Número total de passos de tempo da simulação.
+            hotspot_pos (tuple, optional): Posição (linha, coluna) de um ponto quente fixo.
+            hotspot_temp (float, optional): Temperatura do ponto quente.
+
+        Returns:
+            np.ndarray: A grade final de temperaturas (copiada de volta para a memória do host).
+
+        Raises:
+            ValueError: Se hotspot_pos for fornecido sem hotspot_temp, ou vice-versa.
+        """
+        if (hotspot_pos is not None and hotspot_temp is None) or \
+           (hotspot_pos is None and hotspot_temp is not None):
+            raise ValueError("hotspot_pos e hotspot_temp devem ser fornecidos juntos ou nenhum deles.")
+
+        # Reinicia o estado da simulação para garantir que cada chamada a `solve` comece do zero.
+        self._initialize_simulation_state(self.initial_temp, hotspot_pos, hotspot_temp)
+
+        step = _get_step_kernel(self.dtype)
+        hot_r, hot_c = hotspot_pos if hotspot_pos else (-1, -1)
+        hot_t = self.dtype.type(hotspot_temp if hotspot_pos else 0.0)
+        blocks = ((self.grid_size + BLOCK - 1) // BLOCK, (self.grid_size + BLOCK - 1) // BLOCK)
+        threads = (BLOCK, BLOCK)
+
+        start_time = time.perf_counter()
+
+        # As grades (com as bordas e o hotspot já aplicados) vão para a GPU uma única vez.
+        d_current = cuda.to_device(self.current_grid)
+        d_next = cuda.to_device(self.next_grid)
+        for _ in range(num_iterations):
+            step[blocks, threads](d_current, d_next, self.c, hot_r, hot_c, hot_t)
+            # Double buffering na GPU: só as referências aos arrays do dispositivo são trocadas.
+            d_current, d_next = d_next, d_current
+        d_current.copy_to_host(self.current_grid) # Sincroniza e traz a grade final de volta
+
+        end_time = time.perf_counter()
+        print(f"Tempo de execução CUDA: {end_time - start_time:.4f} segundos")
+        return self.current_grid
+
+# --- Exemplo de Uso do Solver CUDA ---
+if __name__ == "__main__":
+    # --- Parâmetros da Simulação ---
+    GRID_SIZE = 2048       # Dimensão da grade. A GPU só se paga em grades grandes.
+    INITIAL_TEMP = 20.0    # Temperatura inicial uniforme em toda a grade.
+    BOUNDARY_TEMP = 0.0    # Temperatura fixa nas 4 bordas da grade (condição de Dirichlet).
+    HOTSPOT_TEMP = 100.0   # Temperatura do ponto quente central.
+    HOTSPOT_POS = (GRID_SIZE // 2, GRID_SIZE // 2) # Posição exata do ponto quente.
+    ALPHA = 0.1            # Coeficiente de difusividade térmica do material.
+    DX = 1.0               # Espaçamento da grade em metros.
+    DT = 0.1               # Passo de tempo em segundos. Cuidado com a condição CFL!
+    NUM_ITERATIONS = 500   # Número de passos de tempo para simular a difusão.
+
+    print(f"\n--- Simulação CUDA de Difusão de Calor ---")
+    print(f"Grade: {GRID_SIZE}x{GRID_SIZE}, Iterações: {NUM_ITERATIONS}")
+
+    try:
+        solver_cuda = CudaHeatDiffusionSolver(GRID_SIZE, INITIAL_TEMP, BOUNDARY_TEMP, ALPHA, DT, DX)
+    except RuntimeError as e:
+        print(f"Erro: {e}")
+    else:
+        final_grid_cuda = solver_cuda.solve(NUM_ITERATIONS, HOTSPOT_POS, HOTSPOT_TEMP)
+        print(f"Temperatura média final: {final_grid_cuda.mean():.4f}")
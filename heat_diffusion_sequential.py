@@ -3,7 +3,7 @@ import numpy as np
 import time
 import math # Para math.isclose em verificações de resultado, se necessário
 
-from heat_diffusion_base import BaseHeatDiffusion
+from heat_diffusion_base import BaseHeatDiffusion, _stencil_run
 
 class SequentialHeatDiffusionSolver(BaseHeatDiffusion):
     """
@@ -11,11 +11,11 @@ class SequentialHeatDiffusionSolver(BaseHeatDiffusion):
     Esta implementação serve como linha de base para comparação de desempenho
     e validação da correção das implementações paralelas.
     """
-    def __init__(self, grid_size, initial_temp, boundary_temp, alpha, dt, dx):
+    def __init__(self, grid_size, initial_temp, boundary_temp, alpha, dt, dx, dtype=np.float32):
         """
         Inicializa o solver sequencial, chamando o construtor da classe base.
         """
-        super().__init__(grid_size, initial_temp, boundary_temp, alpha, dt, dx)
+        super().__init__(grid_size, initial_temp, boundary_temp, alpha, dt, dx, dtype)
 
     def solve(self, num_iterations, hotspot_pos=None, hotspot_temp=None):
         """
@@ -39,42 +39,40 @@ class SequentialHeatDiffusionSolver(BaseHeatDiffusion):
 
         # Reinicia o estado da simulação para garantir que cada chamada a `solve` comece do zero.
         # Isso é crucial para comparações justas de desempenho ou para executar múltiplas simulações.
-        self._initialize_simulation_state(self.current_grid[1,1], hotspot_pos, hotspot_temp)
-        # Nota: current_grid[1,1] é usado como uma célula interna representativa para initial_temp.
+        self._initialize_simulation_state(self.initial_temp, hotspot_pos, hotspot_temp)
 
         start_time = time.perf_counter() # Usa time.perf_counter para medições de tempo de alta precisão.
 
-        for _ in range(num_iterations):
-            # Percorre apenas as células internas da grade (exclui as bordas).
-            # As bordas são fixas pelas condições de contorno e não são atualizadas pelo stencil.
-            # O loop vai de 1 a grid_size-2 (inclusive) para linhas e colunas.
-            for r in range(1, self.grid_size - 1):
-                for c in range(1, self.grid_size - 1):
-                    # Se houver um hotspot nesta célula, sua temperatura é mantida constante e não é atualizada.
-                    if hotspot_pos and hotspot_pos[0] == r and hotspot_pos[1] == c:
-                        self.next_grid[r, c] = hotspot_temp
-                    else:
-                        # Calcula a nova temperatura da célula (r, c) usando a grade atual (current_grid)
-                        # e armazena o resultado na grade futura (next_grid).
-                        self.next_grid[r, c] = self._update_cell(r, c, self.current_grid)
-
-            # --- Double Buffering Swap ---
-            # Após todas as células internas terem sido calculadas para o próximo passo de tempo
-            # e armazenadas em `self.next_grid`, as grades são trocadas.
-            # `self.next_grid` (que agora contém os novos valores) torna-se `self.current_grid`
-            # para a próxima iteração, e `self.current_grid` (os valores antigos) torna-se `self.next_grid`
-            # para ser preenchida na próxima iteração.
-            self.current_grid, self.next_grid = self.next_grid, self.current_grid
-
-            # Garante que as bordas da nova `current_grid` (que era a `next_grid` anterior)
-            # permaneçam com as condições de contorno. Embora o `_update_cell` não as toque,
-            # esta chamada reforça a imutabilidade das bordas.
-            self._apply_boundary_conditions(self.current_grid)
-
-            # Se houver um hotspot, garante que sua temperatura seja restaurada, caso tenha sido
-            # acidentalmente sobrescrita ou para reforçar sua constância.
-            if hotspot_pos:
-                self.current_grid[hotspot_pos] = hotspot_temp
+        if _stencil_run is not None and self.dtype in (np.float32, np.float64):
+            # Com numba, o laço de tempo inteiro roda numa única chamada compilada (`_stencil_run`):
+            # nenhum despacho Python por passo. Tem precedência sobre os kernels nativos (AOT/C) de
+            # `_apply_stencil`, que não são mais rápidos que o laço fundido. As bordas nunca são escritas pelo
+            # stencil e o hotspot é fixado no próprio kernel. Só resta acertar qual das duas grades
+            # ficou com o resultado (a cada passo elas se alternam).
+            hot_r, hot_c = hotspot_pos if hotspot_pos else (-1, -1)
+            hot_t = hotspot_temp if hotspot_pos else 0.0
+            _stencil_run(self.current_grid, self.next_grid, self.c, num_iterations, hot_r, hot_c, hot_t)
+            self._which ^= num_iterations & 1
+        else:
+            for _ in range(num_iterations):
+                # Calcula todas as células internas de uma vez (as bordas, fixas, não são tocadas),
+                # lendo da grade atual (current_grid) e escrevendo na grade futura (next_grid).
+                # `_apply_stencil` é a versão vetorizada de `_update_cell`: um único kernel nativo
+                # (numba, ou a expressão NumPy com fatias deslocadas, numexpr ou C) em vez de uma
+                # chamada Python por célula. Se houver um hotspot, sua temperatura é mantida constante:
+                # o valor calculado pelo stencil nessa célula é sobrescrito no próprio kernel.
+                self._apply_stencil(self.current_grid, self.next_grid, hotspot_pos, hotspot_temp)
+
+                # --- Double Buffering Swap ---
+                # Após todas as células internas terem sido calculadas para o próximo passo de tempo
+                # e armazenadas em `self.next_grid`, as grades são trocadas.
+                # `self.next_grid` (que agora contém os novos valores) torna-se `self.current_grid`
+                # para a próxima iteração, e `self.current_grid` (os valores antigos) torna-se `self.next_grid`
+                # para ser preenchida na próxima iteração.
+                # As bordas não precisam ser reaplicadas: o stencil nunca as escreve, e as duas
+                # grades já as receberam em `_initialize_simulation_state`.
+                # O hotspot também não: `_apply_stencil` já o escreveu na `next_grid`.
+                self._swap_grids()
 
         end_time = time.perf_counter()
         print(f"Tempo de execução sequencial: {end_time - start_time:.4f} segundos")
@@ -1,28 +1,51 @@
 
+import os
 import socket
+import multiprocessing
 import numpy as np
 import time
 import pickle # Importar pickle para tratamento de erros
 import struct # Importar struct para tratamento de erros
-from shared_utils import send_pickled_data, receive_pickled_data, BaseHeatDiffusion
+from shared_utils import (send_msg, recv_msg, send_rows, recv_rows_into,
+                          send_array, recv_array, configure_socket,
+                          SHM_GO_TOKEN, SHM_DONE_TOKEN, SharedGrid, BaseHeatDiffusion)
 
 class HeatDiffusionWorker(BaseHeatDiffusion):
     """
     Um Worker processa uma sub-seção da grade da simulação de difusão de calor.
-    Ele recebe os dados do Master (incluindo halos), calcula as novas temperaturas
-    para sua região interna e envia os resultados de volta.
+    Ele recebe sua sub-grade do Master uma única vez e a mantém entre as iterações.
+    A cada iteração recebe apenas os halos, calcula as novas temperaturas para sua região
+    interna e devolve somente as linhas de borda (que servem de halo aos vizinhos); essas linhas
+    trafegam como bytes brutos (`send_rows`/`recv_rows_into`), sem pickle.
+    A sub-grade completa só é enviada de volta quando o Master a coleta, ao final.
+
+    No modo de troca direta (`peer_exchange`), os halos não passam pelo Master: cada worker
+    mantém conexões TCP persistentes com os vizinhos de cima e de baixo e troca com eles suas
+    linhas de borda a cada iteração. O Master só participa da inicialização e da coleta final.
+
+    No modo de memória compartilhada (Master e worker na mesma máquina), o worker mapeia as grades
+    globais do Master e calcula suas linhas diretamente nelas; o socket só transporta os tokens
+    de sincronização de cada iteração.
     """
-    def __init__(self, master_host, master_port):
+    def __init__(self, master_host, master_port, tile_rows=None, tile_cols=None, sweep_threads=None):
         # BaseHeatDiffusion será inicializada mais tarde com a configuração do Master.
         # Valores temporários são usados aqui, pois os parâmetros reais vêm do Master.
-        super().__init__(grid_size=0, alpha=0, dt=0, dx=0, boundary_temp=0) 
+        # dx=1 apenas evita a divisão por zero no cálculo de `c`, que é refeito com a configuração real.
+        # Os blocos e as threads da varredura (opcionais, veja `BaseHeatDiffusion.sweep`) são locais a cada worker:
+        # com vários workers na mesma máquina (e sem numba), `sweep_threads` evita mais threads que núcleos.
+        super().__init__(grid_size=0, alpha=0, dt=0, dx=1, boundary_temp=0,
+                         tile_rows=tile_rows, tile_cols=tile_cols, sweep_threads=sweep_threads)
         self.master_host = master_host
         self.master_port = master_port
         self.sock = None # Socket para conexão com o Master
+        self.up_sock = None # Conexão com o vizinho de cima (modo peer_exchange)
+        self.down_sock = None # Conexão com o vizinho de baixo (modo peer_exchange)
 
     def _connect_to_master(self):
         """Estabelece a conexão do worker com o Master."""
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Sem Nagle e com buffers grandes (veja `configure_socket`); antes do `connect`, para valer já no handshake.
+        configure_socket(self.sock)
         print(f"Worker: Tentando conectar a {self.master_host}:{self.master_port}...")
         # Aumentar o timeout de conexão pode ser útil em redes com maior latência.
         self.sock.settimeout(30) # 30 segundos de timeout para conexão
@@ -30,6 +53,109 @@ class HeatDiffusionWorker(BaseHeatDiffusion):
         self.sock.settimeout(None) # Resetar timeout para operações de leitura/escrita
         print(f"Worker: Conectado ao Master em {self.master_host}:{self.master_port}.")
 
+    def _compute_local_step(self, local_current, local_next, num_rows_worker, hotspot_pos_relative, hotspot_temp):
+        """
+        Calcula as novas temperaturas das células internas da sub-grade, lendo de `local_current`
+        (que já deve conter os halos atualizados) e escrevendo em `local_next`.
+        """
+        # As células a serem atualizadas vão da linha 1 até `num_rows_worker` (inclusive) da grade local.
+        # As colunas internas são de 1 a `self.grid_size - 2` (excluindo as bordas laterais que são fixas).
+        # Todas são calculadas de uma vez por `sweep` (o kernel numba, ou `update_grid_vectorized`, a versão
+        # em bloco de `_update_cell`), escrevendo direto no interior de `local_next`.
+        # `local_current` tem exatamente `num_rows_worker` linhas internas, mais uma de cada lado.
+        self.sweep(local_current, local_next)
+
+        # Se há um hotspot nesta sub-grade, sua temperatura é fixada uma única vez após a varredura,
+        # em vez de testar a condição em todas as células.
+        # `+ 1` converte o índice relativo à sub-grade para o índice da grade local (que inclui o halo superior).
+        if hotspot_pos_relative is not None:
+            local_next[hotspot_pos_relative[0] + 1, hotspot_pos_relative[1]] = hotspot_temp
+
+    def _listen_for_peer(self):
+        """
+        Abre o socket de escuta pelo qual o vizinho de baixo se conectará (modo peer_exchange)
+        e informa seu endereço ao Master.
+        """
+        self.peer_listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # Escuta na mesma interface usada para falar com o Master, numa porta livre escolhida pelo SO.
+        self.peer_listener.bind((self.sock.getsockname()[0], 0))
+        self.peer_listener.listen(1)
+        host, port = self.peer_listener.getsockname()
+        send_msg(self.sock, {"type": "PEER_LISTEN", "host": host, "port": port})
+
+    def _connect_to_peers(self, up_neighbor, has_down_neighbor):
+        """
+        Estabelece as conexões persistentes com os vizinhos (modo peer_exchange).
+        Cada worker conecta-se ao vizinho de cima e aceita a conexão do vizinho de baixo. Como o
+        `listen` do vizinho já aceita conexões pendentes, conectar antes de aceitar não bloqueia.
+        """
+        if up_neighbor is not None:
+            self.up_sock = socket.create_connection(tuple(up_neighbor), timeout=30)
+            self.up_sock.settimeout(None)
+            configure_socket(self.up_sock) # Como em `_connect_to_master`
+        if has_down_neighbor:
+            self.peer_listener.settimeout(30)
+            self.down_sock, _ = self.peer_listener.accept()
+            self.down_sock.settimeout(None)
+            configure_socket(self.down_sock)
+        self.peer_listener.close()
+
+    def _exchange_halos_with_peers(self, worker_id, local_current, num_rows_worker):
+        """
+        Troca as linhas de borda da sub-grade com os vizinhos e grava os halos recebidos em `local_current`.
+
+        Cada ligação (i, i+1) é tratada numa fase de paridade i % 2, e nela o worker de cima envia
+        primeiro enquanto o de baixo recebe primeiro. Assim nenhuma ligação tem os dois lados
+        bloqueados em `sendall` ao mesmo tempo, seja qual for o tamanho das linhas (sem deadlock).
+        """
+        def exchange_down():
+            # Este worker é o de cima na ligação: envia sua última linha e recebe o halo inferior.
+            if self.down_sock is not None:
+                send_rows(self.down_sock, [local_current[num_rows_worker, :]])
+                recv_rows_into(self.down_sock, [local_current[num_rows_worker + 1, :]])
+
+        def exchange_up():
+            # Este worker é o de baixo na ligação: recebe o halo superior e envia sua primeira linha.
+            if self.up_sock is not None:
+                recv_rows_into(self.up_sock, [local_current[0, :]])
+                send_rows(self.up_sock, [local_current[1, :]])
+
+        if worker_id % 2 == 0:
+            exchange_down() # Fase 0: ligação (i, i+1)
+            exchange_up()   # Fase 1: ligação (i-1, i)
+        else:
+            exchange_up()   # Fase 0: ligação (i-1, i)
+            exchange_down() # Fase 1: ligação (i, i+1)
+
+    def _run_shared_iterations(self, shm_name, master_pid, assignment):
+        """
+        Executa as iterações no modo de memória compartilhada.
+        A cada token do Master, aplica o stencil às suas linhas lendo da grade global atual e
+        escrevendo na próxima; as vistas incluem as linhas vizinhas, que fazem o papel dos halos.
+        """
+        # O Master é o dono do bloco (e quem o remove); o worker só o mapeia. Um worker no próprio processo
+        # do Master (e.g., num thread) usa o resource_tracker dele, e um iniciado por `multiprocessing` herda
+        # o do processo que o criou (em geral, o Master): só um processo independente tem um tracker próprio.
+        own_tracker = os.getpid() != master_pid and multiprocessing.parent_process() is None
+        shared = SharedGrid((2, self.grid_size, self.grid_size), self.dtype, name=shm_name, own_tracker=own_tracker)
+        try:
+            grids = shared.array
+            start_r = assignment["start_global_row"]
+            end_r = assignment["end_global_row"]
+            num_rows_worker = end_r - start_r
+            cur = 0 # Mesmo índice da grade atual que o Master (ambos começam em 0 e alternam a cada iteração)
+            for _ in range(assignment["num_iterations"]):
+                if self.sock.recv(1) != SHM_GO_TOKEN:
+                    raise EOFError("Conexão com o Master encerrada durante as iterações.")
+                self._compute_local_step(grids[cur, start_r - 1:end_r + 1], grids[cur ^ 1, start_r - 1:end_r + 1],
+                                         num_rows_worker, assignment["hotspot_pos_relative"], assignment["hotspot_temp"])
+                cur ^= 1
+                self.sock.sendall(SHM_DONE_TOKEN)
+        finally:
+            # As vistas precisam ser descartadas antes de fechar o mapeamento.
+            grids = None
+            shared.close()
+
     def run(self):
         """
         Inicia a operação do worker. Conecta-se ao Master, recebe a configuração inicial,
@@ -40,7 +166,7 @@ class HeatDiffusionWorker(BaseHeatDiffusion):
         try:
             # 1. Recebe a configuração inicial do Master.
             # Esta é a primeira mensagem esperada do Master após a conexão.
-            initial_config = receive_pickled_data(self.sock)
+            initial_config = recv_msg(self.sock)
             if initial_config is None or initial_config.get("type") != "INITIAL_CONFIG":
                 raise ValueError("Configuração inicial inválida ou ausente recebida do Master. O worker não pode prosseguir.")
             
@@ -51,16 +177,110 @@ class HeatDiffusionWorker(BaseHeatDiffusion):
             self.dt = initial_config["dt"]
             self.dx = initial_config["dx"]
             self.boundary_temp = initial_config["boundary_temp"]
+            self.dtype = np.dtype(initial_config["dtype"])
             # Recalcula 'c' que é o fator de difusão, essencial para a equação da difusão de calor.
-            self.c = self.alpha * self.dt / (self.dx**2) 
+            # No tipo das grades, como em `BaseHeatDiffusion.__init__`.
+            self.c = self.dtype.type(self.alpha * self.dt / (self.dx**2))
+            self._set_coefficients()
 
             print(f"Worker: Configuração recebida. Grade global: {self.grid_size}x{self.grid_size}, dt: {self.dt}, dx: {self.dx}, c: {self.c:.4f}")
 
-            # Loop principal para processar cada iteração da simulação.
-            # O worker permanece ativo e processando até que o Master envie uma mensagem de término.
+            peer_exchange = initial_config.get("peer_exchange", False)
+            if peer_exchange:
+                self._listen_for_peer()
+
+            # 2. Recebe a sub-grade inicial do Master, uma única vez.
+            # Junto com ela vêm os dados que não mudam entre iterações (a posição relativa do hotspot).
+            # No modo de memória compartilhada, recebe apenas a faixa de linhas e itera direto nas grades do Master.
+            initial_sub_grid = recv_msg(self.sock)
+            if initial_sub_grid is not None and initial_sub_grid.get("type") == "SHARED_SUB_GRID":
+                self._run_shared_iterations(initial_config["shm_name"], initial_config["master_pid"], initial_sub_grid)
+                initial_sub_grid = recv_msg(self.sock)
+                if initial_sub_grid is None or initial_sub_grid.get("type") != "TERMINATE":
+                    raise ValueError("Mensagem de término ausente ao final das iterações em memória compartilhada.")
+                print("Worker: Mensagem de término recebida do Master. Finalizando.")
+                return
+            if initial_sub_grid is None or initial_sub_grid.get("type") != "INITIAL_SUB_GRID":
+                raise ValueError("Sub-grade inicial inválida ou ausente recebida do Master. O worker não pode prosseguir.")
+            hotspot_pos_relative = initial_sub_grid["hotspot_pos_relative"] # Posição do hotspot relativa à sub_grid_core.
+            hotspot_temp = initial_sub_grid["hotspot_temp"]
+
+            # A dimensão da sub-grade do worker (número de linhas que ele calcula x grid_size).
+            num_rows_worker = initial_sub_grid["num_rows"]
+
+            # Grades de trabalho locais do worker (double buffering), mantidas por toda a simulação.
+            # Cada uma tem `num_rows_worker` linhas para o core do worker, mais as linhas de halo acima
+            # (`top`) e abaixo (`bottom`): uma de cada lado, ou `time_tile` no modo de halos via Master.
+            # Elas permitem aplicar o stencil de 5 pontos também às linhas das bordas do core.
+            # Nas bordas globais, o halo é uma única linha com a temperatura de contorno.
+            # O core é preenchido uma vez; depois disso, só as linhas de halo da grade atual são reescritas.
+            top = initial_sub_grid["halo_top_depth"]
+            bottom = initial_sub_grid["halo_bottom_depth"]
+            local_current = np.full((top + num_rows_worker + bottom, self.grid_size), self.boundary_temp,
+                                    dtype=self.dtype)
+            # A sub-grade (a parte da grade que este worker calcula) chega logo após os metadados, como
+            # bytes brutos, e é recebida direto nas linhas do core da grade local, sem array intermediário.
+            recv_array(self.sock, out=local_current[top:top + num_rows_worker, :])
+            # A segunda grade do par de double buffering é alocada uma vez por `set_grids`; a cada passo,
+            # `step` lê de uma das grades locais e escreve na outra, sem alocações nem cópias.
+            self.set_grids(local_current)
+
+            if peer_exchange:
+                # Modo de troca direta: o worker executa todas as iterações sozinho, trocando os halos
+                # com os vizinhos. Nas bordas globais, o halo é a condição de contorno já preenchida.
+                # `+ 1` converte a posição do hotspot relativa à sub-grade para a grade local (halo superior).
+                self._connect_to_peers(initial_sub_grid["up_neighbor"], initial_sub_grid["has_down_neighbor"])
+                fixed_cell = None
+                if hotspot_pos_relative is not None:
+                    fixed_cell = (hotspot_pos_relative[0] + 1, hotspot_pos_relative[1], hotspot_temp)
+                for _ in range(initial_sub_grid["num_iterations"]):
+                    self._exchange_halos_with_peers(initial_sub_grid["worker_id"], self.current_grid, num_rows_worker)
+                    self.step(1, fixed_cell)
+            else:
+                # 3. Loop de trocas via Master: a cada troca, recebe os halos (de até `time_tile` linhas) do
+                # Master direto nas linhas de halo da grade local atual, executa `time_tile` passos seguidos
+                # e devolve as linhas `edge_rows` da sub-grade (as únicas que os vizinhos usam como halo).
+                # A cada passo sem novos halos, uma linha a mais de cada halo deixa de ser válida; após
+                # `time_tile` passos o erro não chegou ao core, que está exato. Por isso cada passo só calcula
+                # as linhas ainda válidas (`sweep_k_steps`), e o hotspot é fixado mesmo que caia num halo
+                # (`hotspot_pos_tile`). Nas bordas globais não há halo a receber: a linha de halo
+                # local já contém a condição de contorno (nas duas grades) e nunca é sobrescrita.
+                time_tile = initial_sub_grid["time_tile"]
+                num_iterations = initial_sub_grid["num_iterations"]
+                hotspot_pos_tile = initial_sub_grid["hotspot_pos_tile"]
+                fixed_cell = None
+                if hotspot_pos_tile is not None:
+                    fixed_cell = (hotspot_pos_tile[0] + 1, hotspot_pos_tile[1], hotspot_temp)
+                edge_rows = [top + r for r in initial_sub_grid["edge_rows"]]
+
+                # Se o worker está numa borda global não muda entre iterações: as vistas das linhas de halo
+                # a receber (nenhuma na borda) e das linhas a devolver são montadas uma única vez para
+                # cada uma das duas grades locais, e o laço escolhe as da grade atual pelo índice `self._which`.
+                def bind_rows(grid):
+                    halos = []
+                    if initial_sub_grid["has_halo_top"]:
+                        halos.extend(grid[:top, :])
+                    if initial_sub_grid["has_halo_bottom"]:
+                        halos.extend(grid[top + num_rows_worker:, :])
+                    return halos, [grid[r, :] for r in edge_rows]
+
+                # Cada troca cobre até `time_tile` passos (a largura dos halos), com os limites inclinados de
+                # `sweep_k_steps`: a cada passo, uma linha a menos de cada halo é calculada (nas bordas globais,
+                # onde o halo é a linha de contorno, nada encolhe).
+                self.halo_width = time_tile
+                shrink_top = initial_sub_grid["has_halo_top"]
+                shrink_bottom = initial_sub_grid["has_halo_bottom"]
+                bound_rows = [bind_rows(grid) for grid in self._grids]
+                for t in range(0, num_iterations, time_tile):
+                    recv_rows_into(self.sock, bound_rows[self._which][0])
+                    self.sweep_k_steps(min(time_tile, num_iterations - t), shrink_top, shrink_bottom, fixed_cell)
+                    send_rows(self.sock, bound_rows[self._which][1])
+            local_current = self.current_grid
+
+            # Após as iterações, o worker permanece ativo até que o Master envie uma mensagem de término;
+            # antes dela, chega o pedido de coleta da sub-grade final (COLLECT).
             while True:
-                # 2. Recebe os dados da iteração do Master.
-                iter_data = receive_pickled_data(self.sock)
+                iter_data = recv_msg(self.sock)
                 if iter_data is None:
                     # Se receber None, significa que a conexão foi fechada inesperadamente (Master terminou ou falhou).
                     print("Worker: Conexão com Master encerrada inesperadamente. Finalizando.")
@@ -68,80 +288,19 @@ class HeatDiffusionWorker(BaseHeatDiffusion):
                 if iter_data.get("type") == "TERMINATE": # Caso o Master envie uma mensagem explícita de término.
                     print("Worker: Mensagem de término recebida do Master. Finalizando.")
                     break
-                if iter_data.get("type") != "ITERATION_UPDATE":
-                    raise ValueError(f"Tipo de mensagem inesperado recebido: {iter_data.get('type')}. Esperado 'ITERATION_UPDATE'.")
-
-                # Desempacota os dados recebidos para a iteração atual.
-                sub_grid_core = iter_data["sub_grid"] # A parte da grade que este worker é responsável por calcular.
-                halo_top = iter_data["halo_top"]       # Linha de dados da grade acima da sub_grid_core.
-                halo_bottom = iter_data["halo_bottom"] # Linha de dados da grade abaixo da sub_grid_core.
-                hotspot_pos_relative = iter_data["hotspot_pos_relative"] # Posição do hotspot relativa à sub_grid_core.
-                hotspot_temp = iter_data["hotspot_temp"]
-
-                # Constrói a grade de trabalho local do worker, incluindo sua sub-grade e os halos.
-                # Esta `local_grid` é crucial. Ela permite que o worker aplique o stencil de 5 pontos
-                # corretamente, mesmo para as células em suas próprias bordas internas,
-                # pois elas terão acesso aos valores dos vizinhos nos halos.
-                
-                # A dimensão da sub-grade do worker (número de linhas que ele calcula x grid_size).
-                num_rows_worker = sub_grid_core.shape[0] 
-                
-                # `local_grid` é uma grade temporária onde os cálculos serão realizados.
-                # Ela tem `num_rows_worker` linhas para o core do worker, mais 2 linhas extras para os halos (top e bottom).
-                local_grid = np.zeros((num_rows_worker + 2, self.grid_size), dtype=np.float64)
-
-                # Preenche a `local_grid` com os dados recebidos:
-                # A linha 0 da `local_grid` corresponde ao halo superior.
-                if halo_top is not None:
-                    local_grid[0, :] = halo_top
-                else: # Se não há halo superior, significa que esta sub-grade está na borda superior da grade global.
-                      # Aplica a condição de contorno global para a linha superior da `local_grid`.
-                    local_grid[0, :] = self.boundary_temp
-
-                # As linhas 1 até `num_rows_worker` (inclusive) da `local_grid` correspondem ao core da sub-grade.
-                local_grid[1:num_rows_worker + 1, :] = sub_grid_core
-
-                # A última linha (`num_rows_worker + 1`) da `local_grid` corresponde ao halo inferior.
-                if halo_bottom is not None:
-                    local_grid[num_rows_worker + 1, :] = halo_bottom
-                else: # Se não há halo inferior, esta sub-grade está na borda inferior da grade global.
-                      # Aplica a condição de contorno global para a linha inferior da `local_grid`.
-                    local_grid[num_rows_worker + 1, :] = self.boundary_temp
-                
-                # `next_local_grid` para double buffering interno do worker.
-                # Os resultados da iteração atual serão armazenados aqui.
-                # Também tem 2 linhas extras para os halos, mas seus valores de halo
-                # não serão atualizados pelo worker, apenas as células internas.
-                next_local_grid = np.copy(local_grid)
-
-                # Calcula as novas temperaturas para as células internas da sub-grade do worker.
-                # As células a serem atualizadas vão da linha 1 até `num_rows_worker` (inclusive) da `local_grid`.
-                # As colunas internas são de 1 a `self.grid_size - 2` (excluindo as bordas laterais que são fixas).
-                # Notar que os índices `r_local` e `c_local` são *relativos* à `local_grid`, que inclui os halos.
-                for r_local in range(1, num_rows_worker + 1): # Itera sobre as linhas do core do worker
-                    for c_local in range(1, self.grid_size - 1): # Itera sobre as colunas internas
-                        # Se há um hotspot nesta célula (na sua posição relativa), sua temperatura é fixada.
-                        # `r_local - 1` é usado para converter o índice da `local_grid` para o índice relativo dentro da `sub_grid_core`.
-                        if hotspot_pos_relative and hotspot_pos_relative[0] == r_local - 1 and hotspot_pos_relative[1] == c_local:
-                            next_local_grid[r_local, c_local] = hotspot_temp
-                        else:
-                            # Chama o método `_update_cell` da classe base para calcular a nova temperatura.
-                            # Este método usa os valores dos vizinhos na `local_grid` atual.
-                            next_local_grid[r_local, c_local] = self._update_cell(r_local, c_local, local_grid)
-
-                # O worker extrai apenas a sua sub-grade atualizada (sem os halos) para enviar de volta ao Master.
-                # O Master é responsável por montar a grade global a partir dessas sub-grades.
-                updated_sub_grid_for_master = next_local_grid[1:num_rows_worker + 1, :].copy()
-
-                # 3. Envia a sub-grade atualizada de volta para o Master.
-                send_pickled_data(self.sock, {
-                    "type": "SUB_GRID_RESULT",
-                    "updated_sub_grid": updated_sub_grid_for_master
-                })
-
-        except (socket.error, pickle.UnpicklingError, struct.error, ValueError) as e:
+                if iter_data.get("type") == "COLLECT": # O Master pede a sub-grade final completa.
+                    send_msg(self.sock, {"type": "SUB_GRID_RESULT"})
+                    # Linhas inteiras de uma grade C-contígua: contígua, enviada direto da grade local.
+                    send_array(self.sock, local_current[top:top + num_rows_worker, :])
+                    continue
+                raise ValueError(f"Tipo de mensagem inesperado recebido: {iter_data.get('type')}. Esperado 'COLLECT' ou 'TERMINATE'.")
+
+        except (socket.error, pickle.UnpicklingError, struct.error, ValueError, EOFError) as e:
             print(f"Worker: Erro durante a execução ou comunicação: {e}")
         finally:
+            for peer_sock in (self.up_sock, self.down_sock):
+                if peer_sock:
+                    peer_sock.close()
             if self.sock:
                 self.sock.close()
                 print("Worker: Socket fechado.")
@@ -1,15 +1,267 @@
 
+import os
 import socket
 import pickle
 import struct # Para empacotar/desempacotar o comprimento da mensagem
+import weakref
+import warnings
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
 
+# numba é opcional: com ele, a varredura do stencil (`BaseHeatDiffusion.sweep`) é um único laço
+# compilado e paralelizado entre os núcleos; sem ele, usa a expressão NumPy vetorizada.
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    # Assinaturas explícitas (grades C-contíguas float64 e float32), como em `heat_diffusion_base`:
+    # o kernel é compilado já na importação (e guardado em cache), nunca durante as iterações.
+    # Não é usado `numba.stencil`, que chamado fora de um njit é recompilado a cada chamada.
+    @njit(["void(f8[:, ::1], f8[:, ::1], f8)", "void(f4[:, ::1], f4[:, ::1], f4)"],
+          parallel=True, fastmath=True, cache=True, boundscheck=False)
+    def _sweep_numba(g, out, c):
+        """
+        Escreve em `out` o stencil de 5 pontos das células internas de `g`, num único passo pela
+        memória e sem arrays temporários; as linhas são divididas entre as threads (prange).
+        As bordas (linhas e colunas 0 e -1) de `out` não são escritas.
+        """
+        R, C = g.shape
+        # Forma fatorada do stencil: (1 - 4c) * centro + c * (N + S + O + L), uma subtração a menos por
+        # célula e um FMA no termo do centro. O coeficiente é calculado uma vez, no tipo da grade.
+        c4 = g.dtype.type(1.0) - g.dtype.type(4.0) * c
+        for i in prange(1, R - 1):
+            for j in range(1, C - 1):
+                out[i, j] = c4 * g[i, j] + c * (g[i-1, j] + g[i+1, j] + g[i, j-1] + g[i, j+1])
+
+    @njit(["void(f8[:, ::1], f8[:, ::1], f8, i8, i8)", "void(f4[:, ::1], f4[:, ::1], f4, i8, i8)"],
+          parallel=True, fastmath=True, cache=True, boundscheck=False)
+    def _sweep_tiled(g, out, c, tile_rows, tile_cols):
+        """
+        Mesmo stencil de `_sweep_numba`, percorrendo as células internas em blocos de
+        `tile_rows` x `tile_cols`; as faixas de `tile_rows` linhas são divididas entre as threads (prange).
+        Cada bloco é calculado por inteiro antes do próximo, de modo que as linhas que ele lê
+        (tile_rows + 2 trechos de tile_cols colunas) ficam em cache mesmo em grades muito largas.
+        """
+        R, C = g.shape
+        c4 = g.dtype.type(1.0) - g.dtype.type(4.0) * c # Como em `_sweep_numba`
+        num_row_tiles = (R - 2 + tile_rows - 1) // tile_rows
+        for t in prange(num_row_tiles):
+            i_start = 1 + t * tile_rows
+            i_end = min(i_start + tile_rows, R - 1)
+            for j_start in range(1, C - 1, tile_cols):
+                j_end = min(j_start + tile_cols, C - 1)
+                for i in range(i_start, i_end):
+                    for j in range(j_start, j_end):
+                        out[i, j] = c4 * g[i, j] + c * (g[i-1, j] + g[i+1, j] + g[i, j-1] + g[i, j+1])
+else:
+    _sweep_numba = None
+    _sweep_tiled = None
+
+# Sem numba, a varredura NumPy é dividida em faixas de linhas entre threads (`BaseHeatDiffusion.sweep`):
+# as operações do NumPy liberam o GIL, então as faixas rodam de fato em paralelo. Cada faixa tem pelo menos
+# SWEEP_MIN_ROWS linhas; abaixo disso, o custo de despachar as tarefas supera o ganho.
+SWEEP_MIN_ROWS = 64
+
+# msgpack é opcional: com ele, os campos das mensagens de controle (`send_msg`) vão em msgpack, mais
+# compacto e mais rápido de decodificar que pickle; sem ele, vão em pickle. Os dois formatos são aceitos
+# na recepção, mas a decodificação de msgpack precisa do pacote também do lado que recebe.
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# SymPy é opcional: com ele, os coeficientes do stencil são deduzidos da equação do calor simbólica
+# (`_symbolic_stencil`) e a expressão vetorizada é gerada por `lambdify`; sem ele, usa as fórmulas diretas.
+# É importado só quando a expressão vetorizada é usada pela primeira vez (`_sympy`), e não com este módulo:
+# a importação custa ~0,3 s por processo, e com numba (o caso comum) a expressão nunca é usada.
+@functools.lru_cache(maxsize=None)
+def _sympy():
+    """O módulo `sympy`, importado na primeira chamada, ou None se não estiver instalado."""
+    try:
+        import sympy
+    except ImportError:
+        return None
+    return sympy
+
+@functools.lru_cache(maxsize=None)
+def _symbolic_stencil():
+    """
+    Deduz simbolicamente o stencil explícito da equação do calor 2D, dT/dt = a * (d2T/dx2 + d2T/dy2):
+    diferenças centradas de 2ª ordem no espaço (espaçamento h) e diferença progressiva no tempo (passo s),
+    resolvida para a temperatura no passo seguinte. Calculado uma única vez por processo (~0,3 s);
+    cada instância só substitui os valores numéricos.
+
+    Returns:
+        tuple: (coeficiente do centro, coeficiente dos vizinhos, (a, s, h)), expressões SymPy em a, s e h.
+
+    Raises:
+        RuntimeError: Se o stencil deduzido não for simétrico nos 4 vizinhos.
+    """
+    sympy = _sympy()
+    x, y, t = sympy.symbols("x y t")
+    h, s, a = sympy.symbols("h s a", positive=True)
+    p = sympy.Function("p")
+    u = p(x, y, t)
+    dxx = u.diff(x, 2).as_finite_difference([x - h, x, x + h])
+    dyy = u.diff(y, 2).as_finite_difference([y - h, y, y + h])
+    dtt = u.diff(t).as_finite_difference([t, t + s])
+    stencil = sympy.solve(sympy.Eq(dtt, a * (dxx + dyy)), p(x, y, t + s))[0]
+    center, north, south, east, west = sympy.symbols("C N S E W")
+    stencil = sympy.expand(stencil.subs({p(x - h, y, t): north, p(x + h, y, t): south,
+                                         p(x, y + h, t): east, p(x, y - h, t): west, p(x, y, t): center}))
+    c_neighbor = stencil.coeff(north)
+    if any(sympy.simplify(stencil.coeff(v) - c_neighbor) != 0 for v in (south, east, west)):
+        raise RuntimeError(f"Stencil simbólico inesperado (vizinhos com coeficientes diferentes): {stencil}")
+    return stencil.coeff(center), c_neighbor, (a, s, h)
+
 # --- Utilidades de Comunicação ---
+#
+# Formato de cada mensagem (pickle protocolo 5 com buffers out-of-band):
+#   "!II"  -> comprimento do cabeçalho pickle e número de buffers out-of-band (k)
+#   "!kQ"  -> comprimento de cada buffer
+#   cabeçalho pickle (metadados dos objetos, sem os dados dos arrays)
+#   k buffers com os bytes brutos dos arrays NumPy contíguos
+# Assim os dados dos arrays vão da memória do remetente direto para o socket, e do socket
+# direto para o buffer que o array do receptor usará, sem cópias intermediárias em objetos bytes.
+
+# Número máximo de buffers por chamada a `sendmsg` (IOV_MAX do SO; 1024 no Linux). Uma lista maior
+# (e.g., os halos de muitas linhas com `time_tile` grande) falharia com EMSGSIZE, e por isso é enviada em partes.
+try:
+    _IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    _IOV_MAX = 1024
+if _IOV_MAX <= 0:
+    _IOV_MAX = 1024
+
+# Tamanho pedido para os buffers de envio e recepção do kernel de cada socket (o Linux o limita a
+# net.core.wmem_max/rmem_max). Com buffers grandes, uma sub-grade inteira ou os halos de uma troca
+# cabem no buffer e são enviados em poucas chamadas, sem esperar o receptor esvaziar a janela.
+SOCKET_BUFFER_BYTES = 4 << 20
+
+def configure_socket(sock):
+    """
+    Configura um socket TCP de Master, worker ou vizinho para as trocas da simulação:
+    desativa o algoritmo de Nagle e aumenta os buffers de envio e recepção para `SOCKET_BUFFER_BYTES`.
+
+    Sem Nagle porque cada troca é uma mensagem pequena (halos, ou um token de 1 byte) seguida de uma
+    espera pela resposta, o padrão em que Nagle + ACK atrasado segura a mensagem ~40 ms.
+    Deve ser chamada antes de `connect` (ou logo após `accept`), para que a janela TCP já use os buffers maiores.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_BYTES)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+
+def _set_cork(sock, on):
+    """
+    Liga/desliga TCP_CORK (só no Linux): enquanto ligado, o kernel junta os dados em segmentos cheios
+    mesmo com TCP_NODELAY. Ignorado em plataformas sem a opção ou em sockets que não são TCP.
+    """
+    if hasattr(socket, "TCP_CORK"):
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, on)
+        except OSError:
+            pass
+
+# Buffers de até este tamanho são copiados e juntados no envio sem `sendmsg` (ver `_sendall_buffers`).
+_SMALL_BUFFER_BYTES = 64 << 10
+
+def _sendall_buffers(sock, buffers):
+    """
+    Envia uma lista de buffers pelo socket com scatter-gather (`sendmsg`), tratando envios parciais,
+    no máximo `_IOV_MAX` buffers por chamada.
+    Quando a lista precisa de mais de uma chamada, o socket fica com TCP_CORK durante o envio, para que
+    o TCP_NODELAY não mande um segmento pequeno ao fim de cada lote.
+    Em plataformas sem `sendmsg` (e.g., Windows), recorre a `sendall`: os buffers pequenos consecutivos
+    (prefixos e cabeçalhos) são juntados num só, para que o TCP_NODELAY não envie cada um num segmento
+    próprio; os grandes (os dados dos arrays) são enviados diretamente, sem cópia.
+    """
+    if not hasattr(sock, "sendmsg"):
+        pending = bytearray()
+        for buf in buffers:
+            view = memoryview(buf).cast("B")
+            if view.nbytes <= _SMALL_BUFFER_BYTES:
+                pending += view
+                continue
+            if pending:
+                sock.sendall(pending)
+                pending.clear()
+            sock.sendall(view)
+        if pending:
+            sock.sendall(pending)
+        return
+    views = [memoryview(buf).cast("B") for buf in buffers if len(buf)]
+    corked = len(views) > _IOV_MAX
+    if corked:
+        _set_cork(sock, 1)
+    try:
+        while views:
+            sent = sock.sendmsg(views[:_IOV_MAX])
+            # Descarta os buffers já enviados por completo e avança dentro do enviado parcialmente.
+            while sent:
+                if sent >= views[0].nbytes:
+                    sent -= views[0].nbytes
+                    views.pop(0)
+                else:
+                    views[0] = views[0][sent:]
+                    sent = 0
+    finally:
+        if corked:
+            _set_cork(sock, 0) # Desligar o cork envia imediatamente o que restou no buffer
+
+# Máximo de bytes pedidos por chamada a `recv_into`. As leituras não usam MSG_WAITALL (cuja semântica
+# varia entre plataformas, e que pode devolver menos bytes ao ser interrompido por um sinal): cada
+# chamada devolve o que já chegou, até RECV_CHUNK bytes, e o laço de `_recv_exact_into` avança até completar.
+RECV_CHUNK = 1 << 20
+
+def _recv_exact_into(sock, buf):
+    """
+    Preenche `buf` (qualquer objeto com buffer gravável) com exatamente `len(buf)` bytes do socket,
+    recebendo diretamente na memória de destino com `recv_into`, em partes de até `RECV_CHUNK` bytes.
+
+    Raises:
+        EOFError: Se a conexão for fechada antes de todos os bytes chegarem.
+    """
+    view = memoryview(buf).cast("B")
+    received = 0
+    while received < view.nbytes:
+        n = sock.recv_into(view[received:received + RECV_CHUNK])
+        if n == 0:
+            raise EOFError("Conexão fechada inesperadamente ao receber dados.")
+        received += n
+
+# Buffer de recepção reutilizável de cada socket, para os prefixos e os cabeçalhos pickle: é alocado
+# na primeira mensagem e só cresce quando chega uma maior, em vez de um objeto novo por mensagem.
+# `socket.socket` usa __slots__ (não aceita atributos novos), por isso o cache fica num dicionário
+# de referências fracas: o buffer é liberado junto com o socket.
+_RECV_BUFFERS = weakref.WeakKeyDictionary()
+_RECV_BUFFER_INITIAL_SIZE = 4096
+
+def _recv_buffer(sock, size):
+    """
+    Devolve uma vista gravável de `size` bytes do buffer de recepção reutilizável de `sock`.
+    A vista só é válida até a próxima chamada para o mesmo socket.
+    """
+    buf = _RECV_BUFFERS.get(sock)
+    if buf is None or size > len(buf):
+        # Cresce trocando o buffer (ao menos dobrando), e não com `extend`: um bytearray com vistas
+        # ainda vivas (e.g., a do prefixo da mensagem atual) não pode ser redimensionado.
+        old_size = len(buf) if buf is not None else _RECV_BUFFER_INITIAL_SIZE // 2
+        buf = _RECV_BUFFERS[sock] = bytearray(max(size, 2 * old_size))
+    return memoryview(buf)[:size]
+
 def send_pickled_data(sock, data):
     """
-    Serializa dados Python usando pickle e os envia através de um socket TCP.
-    A mensagem é precedida por um prefixo de 4 bytes que indica o seu comprimento total.
-    Isso garante que o receptor saiba exatamente quantos bytes esperar para a mensagem completa.
+    Serializa dados Python usando pickle (protocolo 5) e os envia através de um socket TCP.
+    Os arrays NumPy contíguos são enviados out-of-band: seus bytes não são copiados para dentro
+    do pickle, e sim enviados diretamente da memória do array, logo após o cabeçalho.
+    A mensagem é precedida por prefixos de comprimento, de modo que o receptor saiba exatamente
+    quantos bytes esperar para o cabeçalho e para cada buffer.
+    Arrays não contíguos não podem ir out-of-band: o NumPy os copia para dentro do cabeçalho.
+    Por isso os chamadores enviam fatias de linhas inteiras (ou `np.ascontiguousarray`), que são contíguas.
     
     Args:
         sock (socket.socket): O objeto socket conectado.
@@ -18,27 +270,67 @@ def send_pickled_data(sock, data):
     Raises:
         socket.error: Se ocorrer um erro durante a operação de envio.
     """
-    serialized_data = pickle.dumps(data)
-    # '!I' significa: network byte order (big-endian), unsigned int (4 bytes)
-    length_prefix = struct.pack("!I", len(serialized_data)) 
+    buffers = []
+    header = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buf.raw() for buf in buffers]
+    # `raw()` devolve uma vista plana de bytes, que `sendmsg` aceita diretamente. O pickle só entrega
+    # out-of-band buffers contíguos (os demais vão dentro do cabeçalho), então os buffers aqui sempre o são.
+    # '!' significa network byte order (big-endian); 'I' = unsigned int (4 bytes), 'Q' = unsigned long long (8 bytes)
+    prefix = struct.pack(f"!II{len(raw_buffers)}Q", len(header), len(raw_buffers),
+                         *(buf.nbytes for buf in raw_buffers))
+    try:
+        _sendall_buffers(sock, [prefix, header, *raw_buffers])
+    except socket.error as e:
+        print(f"Erro ao enviar dados: {e}")
+        raise # Propaga o erro para ser tratado no Master/Worker
+
+def pack_pickled_data(data):
+    """
+    Serializa dados Python já no formato de mensagem de `send_pickled_data` (prefixos + pickle),
+    para mensagens estáticas que são enviadas várias vezes com `send_raw` sem serem re-serializadas.
+    Eventuais arrays NumPy vão in-band (sem buffers out-of-band); `receive_pickled_data` lê ambos.
+
+    Args:
+        data (any): Os dados Python a serem serializados.
+
+    Returns:
+        bytes: A mensagem completa, pronta para envio.
+    """
+    header = pickle.dumps(data, protocol=5)
+    return struct.pack("!II", len(header), 0) + header
+
+def send_raw(sock, payload_bytes):
+    """
+    Envia uma mensagem já serializada (e.g., por `pack_pickled_data`) através de um socket TCP.
+
+    Args:
+        sock (socket.socket): O objeto socket conectado.
+        payload_bytes (bytes): A mensagem completa, incluindo os prefixos de comprimento.
+
+    Raises:
+        socket.error: Se ocorrer um erro durante a operação de envio.
+    """
     try:
-        # sendall garante que todos os bytes são enviados ou levanta uma exceção
-        sock.sendall(length_prefix + serialized_data)
+        sock.sendall(payload_bytes)
     except socket.error as e:
         print(f"Erro ao enviar dados: {e}")
         raise # Propaga o erro para ser tratado no Master/Worker
 
 def receive_pickled_data(sock):
     """
-    Recebe dados serializados de um socket TCP, lendo primeiro o prefixo de comprimento.
+    Recebe dados serializados de um socket TCP, lendo primeiro os prefixos de comprimento.
     Isso permite a reconstrução correta da mensagem completa, mesmo que ela chegue em pacotes fragmentados.
+    Os prefixos e o cabeçalho pickle são recebidos com `recv_into` no buffer reutilizável do socket
+    (`_recv_buffer`), sem alocar objetos bytes por mensagem; o pickle copia deles o que precisar.
+    Cada buffer out-of-band é recebido diretamente num buffer novo (não inicializado), que passa a ser a
+    memória do array NumPy correspondente (sem cópia adicional ao desserializar).
     
     Args:
         sock (socket.socket): O objeto socket conectado.
         
     Returns:
         any: Os dados Python desserializados. Retorna None se a conexão for fechada
-             ou se ocorrer um erro na leitura do prefixo.
+             antes de receber o prefixo.
              
     Raises:
         socket.error: Se ocorrer um erro durante a operação de recebimento.
@@ -47,28 +339,343 @@ def receive_pickled_data(sock):
         struct.error: Se o prefixo de comprimento for inválido.
     """
     try:
-        # Recebe o prefixo de comprimento (4 bytes)
-        length_prefix = sock.recv(4, socket.MSG_WAITALL) # MSG_WAITALL garante que todos os 4 bytes sejam recebidos
-        if not length_prefix:
+        # Recebe o prefixo fixo (8 bytes): comprimento do cabeçalho e número de buffers
+        prefix = _recv_buffer(sock, 8)
+        received = sock.recv_into(prefix)
+        if not received:
             return None # Conexão fechada ou erro antes de receber o prefixo
-        if len(length_prefix) < 4: # Pode acontecer se a conexão fechar no meio
+        try:
+            _recv_exact_into(sock, prefix[received:])
+        except EOFError: # Pode acontecer se a conexão fechar no meio
             raise EOFError("Conexão fechada inesperadamente ao receber prefixo de comprimento.")
-        
-        length = struct.unpack("!I", length_prefix)[0] # Desempacota o comprimento
-        
-        # Recebe os dados reais em blocos até que todos os 'length' bytes sejam recebidos
-        # Usar MSG_WAITALL é mais simples e robusto para este caso do que um loop manual.
-        data_buffer = sock.recv(length, socket.MSG_WAITALL)
-        if not data_buffer:
-            raise EOFError("Conexão fechada inesperadamente ao receber dados.")
-        if len(data_buffer) < length:
-            raise EOFError("Dados incompletos recebidos.")
+        header_length, num_buffers = struct.unpack("!II", prefix) # Desempacota os comprimentos
+
+        # Os comprimentos dos buffers e o cabeçalho pickle vêm em sequência: uma única leitura no buffer reutilizável.
+        lengths_size = 8 * num_buffers
+        meta = _recv_buffer(sock, lengths_size + header_length)
+        _recv_exact_into(sock, meta)
+        buffer_lengths = struct.unpack_from(f"!{num_buffers}Q", meta)
+        header = meta[lengths_size:]
+        buffers = []
+        for length in buffer_lengths:
+            # `np.empty`, e não `bytearray(length)`: o bytearray zera toda a memória antes de `recv_into`
+            # sobrescrevê-la (~23 ms para 32 MiB); o array NumPy desserializado usa este buffer como memória.
+            buf = np.empty(length, dtype=np.uint8)
+            _recv_exact_into(sock, buf)
+            buffers.append(buf)
             
-        return pickle.loads(data_buffer) # Desserializa os dados
+        return pickle.loads(header, buffers=buffers) # Desserializa os dados
     except (socket.error, EOFError, pickle.UnpicklingError, struct.error) as e:
         print(f"Erro ao receber ou desserializar dados: {e}")
         raise # Propaga o erro
 
+# --- Mensagens de controle compactas ---
+#
+# As mensagens de controle (configuração, pedidos de coleta, término...) são pequenas, e o formato de
+# `send_pickled_data` (8 bytes de prefixo + um pickle com o dicionário inteiro) domina o seu tamanho.
+# Em `send_msg`, cada mensagem é:
+#   1 byte   -> o tipo (`MSG_TYPES[msg["type"]]`); o bit MSG_PICKLED indica os campos em pickle, e não em msgpack
+#   varint   -> comprimento dos campos (LEB128: 7 bits por byte, de 1 a 5 bytes; 0 se não houver campos)
+#   campos   -> os demais itens do dicionário, em msgpack (ou pickle, sem msgpack instalado)
+# COLLECT, TERMINATE e SUB_GRID_RESULT não têm campos: são 2 bytes no total, recebidos numa única leitura.
+# As grades continuam com `send_array`/`send_rows`, e os tokens da memória compartilhada com 1 byte bruto.
+MSG_TYPES = {"INITIAL_CONFIG": 1, "PEER_LISTEN": 2, "SHARED_SUB_GRID": 3, "INITIAL_SUB_GRID": 4,
+             "COLLECT": 5, "SUB_GRID_RESULT": 6, "TERMINATE": 7}
+_MSG_NAMES = {code: name for name, code in MSG_TYPES.items()}
+MSG_PICKLED = 0x80
+
+def _msgpack_default(obj):
+    """Escalares NumPy (e.g., uma posição calculada com arrays) são enviados como os tipos Python equivalentes."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Objeto não serializável em mensagem de controle: {obj!r}")
+
+def pack_msg(msg):
+    """
+    Serializa uma mensagem de controle no formato de `send_msg`, para mensagens enviadas várias vezes
+    sem serem re-serializadas (com `send_raw`).
+
+    Args:
+        msg (dict): A mensagem, com a chave "type" (um dos nomes de `MSG_TYPES`) e os demais campos.
+
+    Returns:
+        bytes: A mensagem completa, pronta para envio.
+
+    Raises:
+        ValueError: Se o tipo da mensagem não estiver em `MSG_TYPES`.
+    """
+    fields = {key: value for key, value in msg.items() if key != "type"}
+    try:
+        kind = MSG_TYPES[msg["type"]]
+    except KeyError:
+        raise ValueError(f"Tipo de mensagem de controle desconhecido: {msg.get('type')!r}")
+    if not fields:
+        payload = b""
+    elif msgpack is not None:
+        payload = msgpack.packb(fields, default=_msgpack_default)
+    else:
+        payload = pickle.dumps(fields, protocol=5)
+        kind |= MSG_PICKLED
+    frame = bytearray([kind])
+    n = len(payload)
+    while n >= 0x80:
+        frame.append((n & 0x7F) | 0x80)
+        n >>= 7
+    frame.append(n)
+    return bytes(frame + payload)
+
+def send_msg(sock, msg):
+    """
+    Envia uma mensagem de controle (um dicionário com "type") no formato compacto descrito acima.
+
+    Args:
+        sock (socket.socket): O objeto socket conectado.
+        msg (dict): A mensagem, com a chave "type" (um dos nomes de `MSG_TYPES`) e os demais campos.
+
+    Raises:
+        socket.error: Se ocorrer um erro durante a operação de envio.
+        ValueError: Se o tipo da mensagem não estiver em `MSG_TYPES`.
+    """
+    send_raw(sock, pack_msg(msg))
+
+def recv_msg(sock):
+    """
+    Recebe uma mensagem de controle enviada por `send_msg` (ou `pack_msg` + `send_raw`).
+    O tipo e o primeiro byte do comprimento são lidos juntos, e os campos no buffer reutilizável do socket.
+
+    Args:
+        sock (socket.socket): O objeto socket conectado.
+
+    Returns:
+        dict: A mensagem, com "type" e os demais campos (as sequências chegam como tuplas).
+              Retorna None se a conexão for fechada antes do início da mensagem.
+
+    Raises:
+        socket.error: Se ocorrer um erro durante a operação de recebimento.
+        EOFError: Se a conexão for fechada no meio da mensagem.
+        ValueError: Se o tipo for desconhecido, o comprimento inválido, ou os campos vierem em msgpack sem
+                    o pacote instalado.
+    """
+    head = _recv_buffer(sock, 2)
+    received = sock.recv_into(head)
+    if not received:
+        return None
+    _recv_exact_into(sock, head[received:])
+    kind, byte = head[0], head[1]
+    name = _MSG_NAMES.get(kind & ~MSG_PICKLED)
+    if name is None:
+        raise ValueError(f"Tipo de mensagem de controle desconhecido recebido: {kind}.")
+    length, shift = byte & 0x7F, 7
+    while byte & 0x80:
+        if shift > 28:
+            raise ValueError("Comprimento (varint) inválido em mensagem de controle.")
+        more = _recv_buffer(sock, 1)
+        _recv_exact_into(sock, more)
+        byte = more[0]
+        length |= (byte & 0x7F) << shift
+        shift += 7
+    msg = {"type": name}
+    if length:
+        payload = _recv_buffer(sock, length)
+        _recv_exact_into(sock, payload)
+        if kind & MSG_PICKLED:
+            msg.update(pickle.loads(payload))
+        elif msgpack is None:
+            raise ValueError("Mensagem de controle em msgpack recebida, mas o pacote msgpack não está instalado.")
+        else:
+            msg.update(msgpack.unpackb(payload, use_list=False))
+    return msg
+
+# --- Linhas de halo/borda por iteração, sem pickle ---
+#
+# As mensagens de cada iteração são só linhas da grade, de tipo e tamanho já conhecidos pelos dois
+# lados (vêm da configuração inicial). Elas são enviadas como bytes brutos precedidos de um cabeçalho
+# "!II" (número de linhas, colunas), e recebidas diretamente nas linhas de destino da grade com
+# `recv_into`: sem serialização, sem objetos intermediários e sem cópia ao chegar.
+# Os dois lados precisam usar o mesmo dtype (e a mesma ordem de bytes, a nativa).
+
+def send_rows(sock, rows):
+    """
+    Envia uma lista de linhas (arrays 1-D C-contíguos de mesmo tamanho) como bytes brutos.
+    Uma lista vazia envia só o cabeçalho, que serve de sinal de sincronização.
+
+    Raises:
+        socket.error: Se ocorrer um erro durante a operação de envio.
+    """
+    header = struct.pack("!II", len(rows), rows[0].size if rows else 0)
+    _sendall_buffers(sock, [header, *rows])
+
+def recv_rows_into(sock, rows):
+    """
+    Recebe linhas enviadas por `send_rows` diretamente nas linhas de destino `rows`
+    (vistas C-contíguas e graváveis, e.g. linhas da grade local).
+
+    Raises:
+        EOFError: Se a conexão for fechada antes de todos os bytes chegarem.
+        ValueError: Se o cabeçalho não corresponder às linhas esperadas.
+    """
+    header = _recv_buffer(sock, 8)
+    _recv_exact_into(sock, header)
+    num_rows, cols = struct.unpack("!II", header)
+    if num_rows != len(rows) or (rows and cols != rows[0].size):
+        raise ValueError(f"Linhas inesperadas recebidas: {num_rows}x{cols}, esperado {len(rows)}x{rows[0].size if rows else 0}.")
+    for row in rows:
+        _recv_exact_into(sock, row)
+
+# --- Arrays inteiros (sub-grades), sem pickle ---
+#
+# As sub-grades enviadas no início (INITIAL_SUB_GRID) e recolhidas no fim (SUB_GRID_RESULT) são as
+# maiores mensagens da simulação. Elas vão como bytes brutos depois de um cabeçalho fixo
+# "!BHII" (código do dtype, número de dimensões, linhas, colunas), e o receptor as recebe com
+# `recv_into` direto no array de destino (e.g., as linhas do core da grade local do worker, ou a
+# fatia correspondente da grade global do Master): sem serialização e sem cópia ao chegar.
+# Os códigos são as posições em `_ARRAY_DTYPES`; a ordem de bytes é a nativa nos dois lados.
+_ARRAY_DTYPES = (np.dtype(np.float64), np.dtype(np.float32))
+_ARRAY_HEADER = struct.Struct("!BHII")
+
+def send_array(sock, arr):
+    """
+    Envia um array NumPy 1-D ou 2-D (float64 ou float32) como cabeçalho "!BHII" + bytes brutos.
+    Um array C-contíguo (e.g., uma fatia de linhas inteiras de uma grade) é enviado direto da sua
+    memória; os demais são copiados uma vez por `np.ascontiguousarray`.
+
+    Raises:
+        ValueError: Se o dtype ou o número de dimensões não forem suportados.
+        socket.error: Se ocorrer um erro durante a operação de envio.
+    """
+    arr = np.ascontiguousarray(arr)
+    if arr.dtype not in _ARRAY_DTYPES or arr.ndim not in (1, 2):
+        raise ValueError(f"send_array: dtype/dimensões não suportados: {arr.dtype}, ndim={arr.ndim}.")
+    rows, cols = arr.shape if arr.ndim == 2 else (arr.shape[0], 1)
+    header = _ARRAY_HEADER.pack(_ARRAY_DTYPES.index(arr.dtype), arr.ndim, rows, cols)
+    _sendall_buffers(sock, [header, arr])
+
+def recv_array(sock, out=None):
+    """
+    Recebe um array enviado por `send_array`.
+
+    Args:
+        sock (socket.socket): O objeto socket conectado.
+        out (np.ndarray, optional): Array de destino, C-contíguo e gravável, com a forma esperada; se
+                                    também tiver o dtype do cabeçalho, os bytes são recebidos diretamente
+                                    na sua memória, senão são convertidos para o seu dtype.
+                                    Se omitido, um novo array é alocado com a forma e o dtype do cabeçalho.
+
+    Returns:
+        np.ndarray: `out` (ou o novo array), preenchido.
+
+    Raises:
+        EOFError: Se a conexão for fechada antes de todos os bytes chegarem.
+        ValueError: Se o cabeçalho for inválido ou não corresponder a `out`.
+    """
+    header = _recv_buffer(sock, _ARRAY_HEADER.size)
+    _recv_exact_into(sock, header)
+    dtype_id, ndim, rows, cols = _ARRAY_HEADER.unpack(header)
+    if dtype_id >= len(_ARRAY_DTYPES) or ndim not in (1, 2):
+        raise ValueError(f"Cabeçalho de array inválido: dtype={dtype_id}, ndim={ndim}.")
+    dtype = _ARRAY_DTYPES[dtype_id]
+    shape = (rows, cols) if ndim == 2 else (rows,)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape or not out.flags['C_CONTIGUOUS']:
+        raise ValueError(f"Array inesperado recebido: {shape} {dtype}, esperado {out.shape} {out.dtype} (C-contíguo).")
+    elif out.dtype != dtype:
+        # Remetente com outra precisão (e.g., um worker float32 num Master float64): os bytes vêm no seu
+        # dtype, indicado pelo cabeçalho, e são convertidos para o de `out` (com uma cópia só neste caso).
+        received = np.empty(shape, dtype=dtype)
+        _recv_exact_into(sock, received)
+        out[...] = received
+        return out
+    _recv_exact_into(sock, out)
+    return out
+
+# --- Modo de memória compartilhada (Master e workers na mesma máquina) ---
+#
+# As duas grades globais ficam num bloco `multiprocessing.shared_memory` que Master e workers mapeiam;
+# por iteração, o socket só carrega um byte em cada sentido: o Master libera o passo com
+# SHM_GO_TOKEN e o worker responde com SHM_DONE_TOKEN depois de escrever suas linhas.
+SHM_GO_TOKEN = b"G"
+SHM_DONE_TOKEN = b"D"
+
+class SharedGrid:
+    """
+    Array NumPy cuja memória é um bloco `multiprocessing.shared_memory`, visível por todos os processos
+    da máquina que o abrirem pelo nome (`name`). Escritas num processo aparecem nos outros sem cópia e
+    sem serialização; a sincronização fica por conta dos chamadores (os tokens SHM_GO/SHM_DONE).
+
+    Quem cria o bloco (sem `name`) é o dono: `close` o remove do sistema. Quem o abre pelo nome só o mapeia,
+    e o bloco não é removido quando esse processo termina.
+    """
+    def __init__(self, shape, dtype, name=None, own_tracker=True):
+        """
+        Args:
+            shape (tuple): Forma do array.
+            dtype (np.dtype): Tipo dos elementos.
+            name (str, optional): Nome de um bloco já criado por outro processo. Se omitido, um novo é criado.
+            own_tracker (bool): Ao abrir pelo nome, se este processo tem um resource_tracker próprio, e não
+                                o herdado do dono (o caso de filhos de `multiprocessing`).
+                                Só importa no Python < 3.13.
+        """
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        else:
+            self.shm = self._attach(name, own_tracker)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+
+    @staticmethod
+    def _attach(name, own_tracker):
+        """Mapeia um bloco existente sem registrá-lo para remoção neste processo."""
+        try:
+            return shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 não tem `track`, e abrir o bloco o registra no resource_tracker do processo.
+            shm = shared_memory.SharedMemory(name=name)
+            if own_tracker:
+                # Um tracker próprio removeria o bloco (ainda em uso pelo dono) quando este processo terminasse.
+                # Já um tracker herdado é o do dono: o registro é o mesmo do dono, e removê-lo aqui faria o
+                # `unlink` do dono gerar um KeyError no tracker.
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            return shm
+
+    @property
+    def name(self):
+        """Nome do bloco, a ser enviado aos outros processos para que o abram."""
+        return self.shm.name
+
+    def close(self):
+        """
+        Desfaz o mapeamento (e, no dono, remove o bloco). As vistas de `array` mantidas pelos chamadores
+        precisam ter sido descartadas antes; se alguma ainda existir (e.g., após um erro), o mapeamento
+        é liberado pelo SO quando o processo terminar.
+        """
+        self.array = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+def _stencil_cell(g, r, col, coef):
+    """
+    Nova temperatura da célula (r, col) de `g` pelo stencil de 5 pontos (a fórmula escalar de referência):
+    T_new(i,j) = T_old(i,j) + coef * (T_old(i-1,j) + T_old(i+1,j) + T_old(i,j-1) + T_old(i,j+1) - 4 * T_old(i,j))
+
+    Função de módulo, e não método, para que um laço por célula não pague a busca de `self.c` a cada chamada:
+    o chamador lê o coeficiente uma vez (como float Python) antes do laço. `g.item` é buscado uma única vez
+    e devolve floats Python, cuja aritmética é mais barata que a dos escalares NumPy de `g[r, col]`
+    (~30% menos tempo por célula, medido).
+
+    Returns:
+        float: A nova temperatura da célula.
+    """
+    item = g.item
+    center = item(r, col)
+    return center + coef * (item(r - 1, col) + item(r + 1, col) + item(r, col - 1) + item(r, col + 1) - 4.0 * center)
+
 # --- Lógica Central da Simulação de Difusão de Calor (reutilizável) ---
 class BaseHeatDiffusion:
     """
@@ -76,26 +683,260 @@ class BaseHeatDiffusion:
     reutilizada pelo Master e pelos Workers. Implementa o método de diferenças finitas
     para a equação do calor 2D.
     """
-    def __init__(self, grid_size, alpha, dt, dx, boundary_temp):
+    # Se o aviso da condição CFL já foi emitido neste processo (veja `__init__`).
+    _cfl_warned = False
+
+    def __init__(self, grid_size, alpha, dt, dx, boundary_temp, dtype=np.float32, tile_rows=None, tile_cols=None,
+                 halo_width=1, sweep_threads=None):
         self.grid_size = grid_size
+        # Profundidade (em linhas) dos halos recebidos a cada troca: o máximo de passos que
+        # `sweep_k_steps` pode executar antes de precisar de halos novos.
+        self.halo_width = halo_width
+        # Tipo de ponto flutuante das grades. float32 por padrão: metade dos bytes de float64,
+        # tanto no stencil (limitado por memória) quanto nos dados serializados enviados pelos sockets.
+        self.dtype = np.dtype(dtype)
         self.alpha = alpha
         self.dt = dt
         self.dx = dx
         self.boundary_temp = boundary_temp
         # Termo constante para a equação de diferenças finitas discretizada.
         # Pré-calculado para eficiência, pois é usado em cada célula a cada iteração.
-        self.c = alpha * dt / (dx**2)
+        # Guardado no tipo das grades: em float32, um escalar float64 promoveria o stencil inteiro a float64.
+        self.c = self.dtype.type(alpha * dt / (dx**2))
+        self._set_coefficients()
+        # Blocos (tiles) da varredura numba: None usa a varredura por linhas inteiras (`_sweep_numba`).
+        # Os blocos não são o padrão porque, medidos com 1 a 500 mil colunas (float32 e float64), a varredura
+        # por linhas foi sempre mais rápida (1,3x a 5x): as 3 linhas que o stencil lê já ficam em cache,
+        # o prefetch do hardware acompanha o fluxo, e os limites variáveis dos blocos atrapalham a vetorização.
+        # Podem compensar em máquinas com caches menores; se dados, valem os dois (veja `sweep`).
+        if (tile_rows is None) != (tile_cols is None) or (tile_rows is not None and min(tile_rows, tile_cols) < 1):
+            raise ValueError("tile_rows e tile_cols devem ser inteiros positivos fornecidos juntos, ou nenhum deles.")
+        self.tile_rows = tile_rows
+        self.tile_cols = tile_cols
+        # Threads da varredura NumPy sem numba (None = um por núcleo). O pool é persistente, como o de
+        # `ParallelHeatDiffusionSolver`, mas só é criado no primeiro sweep que for de fato dividido.
+        self.sweep_threads = sweep_threads if sweep_threads is not None else (os.cpu_count() or 1)
+        self._sweep_pool = None
+        # Índices planos da borda de cada forma de grade (veja `_boundary_index`).
+        self._boundary_idx = {}
 
         # Aviso sobre a condição CFL (Courant-Friedrichs-Lewy) para estabilidade numérica.
         # Para a equação do calor 2D com o método explícito, c <= 0.25 é necessário para estabilidade.
-        if self.c > 0.25:
-            print(f"Atenção: A condição CFL (c = {self.c:.4f} > 0.25) pode levar a instabilidade numérica. "
-                  f"Considere diminuir o passo de tempo (dt) ou aumentar o espaçamento da grade (dx).")
+        # A condição não depende do dtype: float32 só muda o erro de arredondamento (~1e-6 relativo), não a estabilidade.
+        # O aviso sai uma única vez por processo (`_cfl_warned`), e não em cada instância, pelo módulo `warnings`
+        # (filtrável e sem disputar o stdout com os logs dos workers).
+        if self.c > 0.25 and not BaseHeatDiffusion._cfl_warned:
+            BaseHeatDiffusion._cfl_warned = True
+            warnings.warn(f"A condição CFL (c = {self.c:.4f} > 0.25) pode levar a instabilidade numérica. "
+                          f"Considere diminuir o passo de tempo (dt) ou aumentar o espaçamento da grade (dx).",
+                          RuntimeWarning, stacklevel=2)
+
+    def _set_coefficients(self):
+        """
+        Pré-calcula, no tipo das grades, os coeficientes da forma fatorada do stencil,
+        T_new = c4 * T + c1 * (N + S + O + L), com c1 = c e c4 = 1 - 4c.
+        Deve ser chamado de novo sempre que `c` ou `dtype` mudarem (e.g., no worker, com a configuração do Master).
+        Com SymPy, a expressão vetorizada é gerada na primeira chamada de `update_grid_vectorized`
+        (veja `_build_kernel`), e não aqui: com numba ela nunca é usada, e importar o SymPy e deduzir o
+        stencil custa ~0,3 s por processo.
+        """
+        self.c1 = self.dtype.type(self.c)
+        self.c4 = self.dtype.type(1 - 4 * self.c)
+        self._kernel = None
+
+    def _build_kernel(self):
+        """
+        Com SymPy, gera `self._kernel`: a expressão vetorizada do stencil, c4 * C + c1 * (N + S + L + O), com os
+        coeficientes deduzidos de `_symbolic_stencil` para os `alpha`, `dt` e `dx` desta simulação e embutidos
+        como constantes (avaliação parcial). A soma dos vizinhos é mantida agrupada (`UnevaluatedExpr`): sem
+        isso, o SymPy distribuiria c1 e geraria 4 multiplicações em vez de 1. Sem SymPy, `self._kernel` continua
+        None e `update_grid_vectorized` usa a fórmula direta com os coeficientes de `_set_coefficients`.
+        """
+        sympy = _sympy()
+        if sympy is None:
+            return
+        c_center, c_neighbor, (a, s, h) = _symbolic_stencil()
+        values = {a: self.alpha, s: self.dt, h: self.dx}
+        c4 = float(c_center.subs(values))
+        c1 = float(c_neighbor.subs(values))
+        # As constantes vão em float Python: o NumPy as aplica no tipo dos arrays (sem promover float32).
+        self.c1 = self.dtype.type(c1)
+        self.c4 = self.dtype.type(c4)
+        center, north, south, east, west = sympy.symbols("C N S E W")
+        self._kernel = sympy.lambdify((center, north, south, east, west),
+                                      c4 * center + c1 * sympy.UnevaluatedExpr(north + south + east + west),
+                                      "numpy")
+
+    def update_grid_vectorized(self, g, out=None):
+        """
+        Calcula o stencil de 5 pontos de todas as células internas de `g` de uma vez: a versão
+        vetorizada de `_update_cell`, com o laço por célula dentro dos kernels NumPy.
+
+        Cada termo é uma fatia de `g` deslocada de uma célula (Norte = g[:-2, 1:-1], Sul = g[2:, 1:-1],
+        Oeste = g[1:-1, :-2], Leste = g[1:-1, 2:]). Usa a forma fatorada c4 * centro + c1 * (N + S + O + L)
+        (veja `_set_coefficients`; com SymPy, a expressão gerada por `_build_kernel`): uma passagem pela
+        memória a menos que centro + c * (N + S + O + L - 4 * centro), medida ~5-15% mais rápida de 200x200
+        a 3000x3000. A expressão é escrita numa única linha, e não como
+        uma cadeia de ufuncs com `out=`: o NumPy já reaproveita os temporários da expressão encadeada,
+        e a cadeia com `out=` (7 passagens pela memória) mediu até ~1,6x mais lenta até 1000 colunas.
+
+        Args:
+            g (np.ndarray): Grade de entrada, incluindo as linhas/colunas vizinhas (halos ou bordas).
+            out (np.ndarray, optional): Destino com a forma do interior, (R-2, C-2); pode ser uma vista,
+                                        e.g. o interior da próxima grade. Se omitido, um novo array é alocado.
+
+        Returns:
+            np.ndarray: `out`, com as novas temperaturas das células internas.
+        """
+        if self._kernel is None:
+            self._build_kernel()
+        if self._kernel is not None:
+            new = self._kernel(g[1:-1, 1:-1], g[:-2, 1:-1], g[2:, 1:-1], g[1:-1, 2:], g[1:-1, :-2])
+        else:
+            new = self.c4 * g[1:-1, 1:-1] + self.c1 * (g[:-2, 1:-1] + g[2:, 1:-1] + g[1:-1, :-2] + g[1:-1, 2:])
+        if out is None:
+            return new
+        out[...] = new
+        return out
+
+    def _c_for(self, g):
+        """`self.c` no tipo de `g` (a assinatura do kernel numba exige o mesmo tipo da grade)."""
+        return self.c if g.dtype == self.dtype else g.dtype.type(self.c)
+
+    def sweep(self, g, out):
+        """
+        Escreve no interior de `out` (mesma forma de `g`) o stencil de 5 pontos das células internas de `g`.
+        Usa o kernel numba se disponível (grades C-contíguas float32/float64): em blocos de
+        `tile_rows` x `tile_cols` se configurados, senão por linhas inteiras. Sem numba, usa
+        `update_grid_vectorized` em faixas de linhas divididas entre threads (`_sweep_striped`).
+        As bordas de `out` não são escritas.
+        """
+        if (_sweep_numba is not None and g.dtype in (np.float32, np.float64) and
+                g.flags['C_CONTIGUOUS'] and out.flags['C_CONTIGUOUS']):
+            if self.tile_rows is None:
+                _sweep_numba(g, out, self._c_for(g))
+            else:
+                _sweep_tiled(g, out, self._c_for(g), self.tile_rows, self.tile_cols)
+        else:
+            self._sweep_striped(g, out)
+
+    def _sweep_striped(self, g, out):
+        """
+        Varredura NumPy de `sweep` (sem numba): as linhas internas são divididas em até `sweep_threads`
+        faixas contíguas de pelo menos SWEEP_MIN_ROWS linhas, e cada faixa é um `update_grid_vectorized`
+        no pool de threads. Cada faixa lê as suas linhas mais uma vizinha de cada lado e escreve só as suas
+        em `out`, então as faixas nunca escrevem na mesma região. Com uma faixa só, roda no próprio thread.
+        """
+        rows = g.shape[0] - 2
+        num_stripes = min(self.sweep_threads, rows // SWEEP_MIN_ROWS)
+        if num_stripes <= 1:
+            self.update_grid_vectorized(g, out=out[1:-1, 1:-1])
+            return
+        # A expressão (com SymPy) é gerada aqui, antes das threads, e não por cada uma em `update_grid_vectorized`.
+        if self._kernel is None:
+            self._build_kernel()
+        if self._sweep_pool is None:
+            self._sweep_pool = ThreadPoolExecutor(max_workers=self.sweep_threads, thread_name_prefix="heat-sweep")
+        bounds = np.linspace(1, rows + 1, num_stripes + 1).astype(int)
+        futures = [self._sweep_pool.submit(self.update_grid_vectorized, g[lo - 1:hi + 1], out[lo:hi, 1:-1])
+                   for lo, hi in zip(bounds[:-1], bounds[1:])]
+        for future in futures:
+            future.result() # Espera todas as faixas (e propaga a exceção de alguma, se houver)
+
+    def set_grids(self, grid):
+        """
+        Adota `grid` como a grade atual do par de double buffering (ping-pong) usado por `step`,
+        e aloca a segunda grade do par uma única vez. Ela não precisa ser uma cópia: o sweep sobrescreve
+        todo o seu interior a cada passo, e só recebem valores as células que ele nunca escreve
+        (as linhas 0 e -1, que são halos ou bordas, e as colunas 0 e -1, bordas globais fixas).
+        As duas grades ficam em `self._grids`, e `current_grid` é `self._grids[self._which]`.
+
+        Returns:
+            np.ndarray: A segunda grade do par.
+        """
+        other = np.empty_like(grid)
+        other[[0, -1], :] = grid[[0, -1], :]
+        other[:, [0, -1]] = grid[:, [0, -1]]
+        self._grids = (grid, other)
+        self._which = 0
+        return other
+
+    @property
+    def current_grid(self):
+        """Grade atual do par criado por `set_grids` (o resultado do último `step`)."""
+        return self._grids[self._which]
+
+    def step(self, num_steps=1, fixed_cell=None):
+        """
+        Executa `num_steps` passos de tempo no par de grades de `set_grids`, sem alocar nem copiar
+        grades: cada passo lê de uma e escreve na outra. Os passos são desenrolados de dois em dois
+        (A -> B -> A), de modo que o par de volta à mesma grade não precisa de troca alguma; só um
+        número ímpar de passos troca a grade atual (`self._which ^= 1`).
+
+        Args:
+            num_steps (int): Número de passos de tempo.
+            fixed_cell (tuple, optional): (linha, coluna, temperatura) de uma célula fixa (e.g., o hotspot),
+                                          reescrita após cada passo.
+
+        Returns:
+            np.ndarray: A grade atual após os passos.
+        """
+        a, b = self._grids[self._which], self._grids[self._which ^ 1]
+        for _ in range(num_steps // 2):
+            self.sweep(a, b)
+            if fixed_cell is not None:
+                b[fixed_cell[0], fixed_cell[1]] = fixed_cell[2]
+            self.sweep(b, a)
+            if fixed_cell is not None:
+                a[fixed_cell[0], fixed_cell[1]] = fixed_cell[2]
+        if num_steps % 2:
+            self.sweep(a, b)
+            if fixed_cell is not None:
+                b[fixed_cell[0], fixed_cell[1]] = fixed_cell[2]
+            self._which ^= 1
+        return self._grids[self._which]
+
+    def sweep_k_steps(self, k, shrink_top=True, shrink_bottom=True, fixed_cell=None):
+        """
+        Executa `k` passos de tempo no par de grades de `set_grids` com os limites inclinados do
+        particionamento por blocos de tempo: a grade atual tem halos de `self.halo_width` linhas, e a cada
+        passo sem halos novos uma linha a mais de cada halo deixa de ser válida. Por isso o passo t
+        (t = 0..k-1) só calcula as linhas [1 + t, R - 1 - t), e não todas: com halos de largura
+        F = 2 * halo_width (somando os dois lados), cada passo consome 2 linhas, e após `k <= halo_width`
+        passos as linhas do core continuam exatas. O lado sem halo (uma borda global, cuja linha de
+        contorno nunca fica inválida) não encolhe: `shrink_top`/`shrink_bottom` = False.
+
+        Args:
+            k (int): Número de passos, no máximo `self.halo_width`.
+            shrink_top (bool): Se a grade tem um halo de `halo_width` linhas em cima.
+            shrink_bottom (bool): Se a grade tem um halo de `halo_width` linhas embaixo.
+            fixed_cell (tuple, optional): (linha, coluna, temperatura) de uma célula fixa, reescrita após cada passo.
+
+        Returns:
+            np.ndarray: A grade atual após os passos.
+
+        Raises:
+            ValueError: Se `k` for maior que `self.halo_width`.
+        """
+        if k > self.halo_width:
+            raise ValueError(f"sweep_k_steps: {k} passos excedem a largura do halo ({self.halo_width}).")
+        R = self._grids[0].shape[0]
+        for t in range(k):
+            # Fatias de linhas inteiras de grades C-contíguas: também C-contíguas (o kernel numba as aceita).
+            lo = t if shrink_top else 0
+            hi = R - t if shrink_bottom else R
+            a, b = self._grids[self._which], self._grids[self._which ^ 1]
+            self.sweep(a[lo:hi], b[lo:hi])
+            if fixed_cell is not None:
+                b[fixed_cell[0], fixed_cell[1]] = fixed_cell[2]
+            self._which ^= 1
+        return self._grids[self._which]
 
     def _update_cell(self, r_local, c_local, grid_with_halo):
         """
         Calcula a nova temperatura de uma célula (r_local, c_local) usando o stencil de 5 pontos.
         Este método implementa a discretização da equação do calor 2D usando diferenças finitas explícitas.
+        Mantido como referência da fórmula: para a grade inteira, use `update_grid_vectorized`.
         
         Args:
             r_local (int): Índice da linha da célula dentro de `grid_with_halo`.
@@ -106,27 +947,61 @@ class BaseHeatDiffusion:
         Returns:
             float: A nova temperatura calculada para a célula.
         """
-        center = grid_with_halo[r_local, c_local]
-        north = grid_with_halo[r_local - 1, c_local]
-        south = grid_with_halo[r_local + 1, c_local]
-        east = grid_with_halo[r_local, c_local + 1]
-        west = grid_with_halo[r_local, c_local - 1]
+        # A fórmula fica em `_stencil_cell`; um laço por célula deve chamá-la diretamente, com
+        # `coef = float(self.c)` lido uma vez antes do laço, em vez de chamar este método.
+        return _stencil_cell(grid_with_halo, r_local, c_local, float(self.c))
+
+    def make_grid(self, interior, shape=None):
+        """
+        Cria uma grade (`self.dtype`) cujas bordas (linhas e colunas 0 e -1) já valem `self.boundary_temp`,
+        com `interior` nas células internas. Como os sweeps só escrevem no interior, as bordas de uma
+        grade criada assim nunca precisam ser reaplicadas enquanto a condição de contorno for constante.
+
+        Args:
+            interior (np.ndarray or float): Valores das células internas (ou um valor uniforme).
+            shape (tuple, optional): Forma (R, C) da grade completa. Se omitida, é a de `interior` + 2 em cada eixo.
+
+        Returns:
+            np.ndarray: A nova grade, C-contígua.
+        """
+        if shape is None:
+            shape = (np.shape(interior)[0] + 2, np.shape(interior)[1] + 2)
+        # Sem `np.full`: cada célula é escrita uma única vez (o interior e, numa só escrita indexada, a borda).
+        grid = np.empty(shape, dtype=self.dtype)
+        grid[1:-1, 1:-1] = interior
+        self._apply_boundary_conditions(grid, self.boundary_temp)
+        return grid
 
-        # Fórmula do stencil de 5 pontos para a atualização da temperatura:
-        # T_new(i,j) = T_old(i,j) + c * (T_old(i-1,j) + T_old(i+1,j) + T_old(i,j-1) + T_old(i,j+1) - 4 * T_old(i,j))
-        return center + self.c * (north + south + east + west - 4 * center)
+    def _boundary_index(self, shape):
+        """
+        Índices planos (em ordem C) das células de borda de uma grade de forma `shape` = (R, C), ordenados
+        e sem repetir os cantos. Calculados uma vez por forma e guardados em `self._boundary_idx`.
+        """
+        idx = self._boundary_idx.get(shape)
+        if idx is None:
+            R, C = shape
+            top = np.arange(C)
+            bottom = np.arange((R - 1) * C, R * C)
+            left = np.arange(0, R * C, C)
+            right = left + C - 1
+            idx = self._boundary_idx[shape] = np.unique(np.concatenate([top, bottom, left, right]))
+        return idx
 
     def _apply_boundary_conditions(self, grid_to_modify, boundary_val):
         """
         Aplica as condições de contorno de Dirichlet (temperatura fixa) a uma grade.
         As células nas bordas da grade são definidas para um valor constante.
-        Modifica a grade in-place.
+        Modifica a grade in-place, com uma única escrita indexada pelos índices planos da borda
+        (`_boundary_index`), em vez de quatro atribuições por fatia.
         
         Args:
             grid_to_modify (np.ndarray): A grade NumPy à qual as condições de contorno serão aplicadas.
             boundary_val (float): O valor da temperatura a ser aplicado nas bordas.
         """
-        grid_to_modify[0, :] = boundary_val  # Borda superior (linha 0)
-        grid_to_modify[-1, :] = boundary_val # Borda inferior (última linha)
-        grid_to_modify[:, 0] = boundary_val  # Borda esquerda (coluna 0)
-        grid_to_modify[:, -1] = boundary_val # Borda direita (última coluna)
+        if grid_to_modify.flags['C_CONTIGUOUS']:
+            # `ravel` de uma grade C-contígua é uma vista: a escrita vale na própria grade.
+            grid_to_modify.ravel()[self._boundary_index(grid_to_modify.shape)] = boundary_val
+        else:
+            # Numa vista não contígua, `ravel` seria uma cópia; escreve por fatias.
+            grid_to_modify[[0, -1], :] = boundary_val
+            grid_to_modify[:, [0, -1]] = boundary_val
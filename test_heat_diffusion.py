@@ -0,0 +1,173 @@
+"""
+Testes de consistência: cada modo de execução deve produzir a mesma grade que o solver sequencial
+(`SequentialHeatDiffusionSolver`), em float64, a menos do arredondamento.
+
+    python -m unittest test_heat_diffusion      (ou: python -m pytest test_heat_diffusion.py)
+
+As simulações distribuídas rodam o Master e os workers em threads do próprio processo de teste,
+em localhost, numa porta livre escolhida pelo SO.
+"""
+import socket
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from heat_diffusion_sequential import SequentialHeatDiffusionSolver
+from heat_diffusion_master import HeatDiffusionMaster
+from heat_diffusion_worker import HeatDiffusionWorker
+
+INITIAL_TEMP = 20.0
+BOUNDARY_TEMP = 0.0
+HOTSPOT_TEMP = 100.0
+ALPHA = 0.1
+DT = 0.1
+DX = 1.0
+# Tolerância para float64: os solvers usam formas algébricas diferentes do mesmo stencil.
+ATOL = 1e-10
+
+def sequential_grid(grid_size, num_iterations, hotspot_pos):
+    """Grade final do solver sequencial (a referência dos testes)."""
+    solver = SequentialHeatDiffusionSolver(grid_size, INITIAL_TEMP, BOUNDARY_TEMP, ALPHA, DT, DX, dtype=np.float64)
+    return solver.solve(num_iterations, hotspot_pos, HOTSPOT_TEMP).copy()
+
+def _free_port():
+    """Porta TCP livre em localhost."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _run_worker(port, deadline):
+    """Executa um worker, tentando de novo enquanto o Master ainda não estiver escutando."""
+    while True:
+        try:
+            HeatDiffusionWorker("127.0.0.1", port).run()
+            return
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+def distributed_grid(grid_size, num_iterations, hotspot_pos, num_workers, **master_options):
+    """
+    Executa a simulação distribuída (Master e `num_workers` workers em threads).
+
+    Returns:
+        tuple: (grade final do Master, o próprio Master, para inspecionar o particionamento).
+    """
+    port = _free_port()
+    master = HeatDiffusionMaster("127.0.0.1", port, grid_size, INITIAL_TEMP, BOUNDARY_TEMP, ALPHA, DT, DX,
+                                 num_workers, hotspot_pos, HOTSPOT_TEMP, dtype=np.float64, **master_options)
+    result = {}
+    master_thread = threading.Thread(target=lambda: result.setdefault("grid", master.run(num_iterations)))
+    master_thread.start()
+    deadline = time.monotonic() + 30
+    workers = [threading.Thread(target=_run_worker, args=(port, deadline), daemon=True) for _ in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    master_thread.join(60)
+    for worker in workers:
+        worker.join(10)
+    if master_thread.is_alive():
+        raise AssertionError("A simulação distribuída não terminou (Master bloqueado).")
+    return result.get("grid"), master
+
+class RepeatedSolveTest(unittest.TestCase):
+    """Cada `solve` recomeça da temperatura inicial, mesmo com o hotspot na primeira célula interna."""
+    def test_hotspot_at_first_interior_cell(self):
+        solver = SequentialHeatDiffusionSolver(20, INITIAL_TEMP, BOUNDARY_TEMP, ALPHA, DT, DX, dtype=np.float64)
+        first = solver.solve(10, (1, 1), HOTSPOT_TEMP).copy()
+        np.testing.assert_array_equal(solver.solve(10, (1, 1), HOTSPOT_TEMP), first)
+
+class BlockedSolveTest(unittest.TestCase):
+    """`solve_blocked` (tiles espaciais com margens de k passos) deve reproduzir `solve`."""
+    def blocked_grid(self, grid_size, num_iterations, hotspot_pos, tile, k):
+        solver = SequentialHeatDiffusionSolver(grid_size, INITIAL_TEMP, BOUNDARY_TEMP, ALPHA, DT, DX, dtype=np.float64)
+        solver.solve(0, hotspot_pos, HOTSPOT_TEMP) # Só inicializa as grades (bordas e hotspot)
+        return solver.solve_blocked(num_iterations, tile=tile, k=k, hotspot_pos=hotspot_pos, hotspot_temp=HOTSPOT_TEMP)
+
+    def assert_matches_sequential(self, grid_size, num_iterations, hotspot_pos, tile, k):
+        np.testing.assert_allclose(self.blocked_grid(grid_size, num_iterations, hotspot_pos, tile, k),
+                                   sequential_grid(grid_size, num_iterations, hotspot_pos), rtol=0, atol=ATOL)
+
+    def test_partial_tiles_and_remainder_steps(self):
+        # 48 células internas em tiles de 10 (o último com 8) e 23 passos com k = 4 (o último bloco com 3).
+        self.assert_matches_sequential(50, 23, (25, 17), tile=10, k=4)
+
+    def test_hotspot_on_tile_edge(self):
+        # O hotspot na primeira linha/coluna de um tile também cai na margem dos tiles vizinhos.
+        self.assert_matches_sequential(50, 12, (11, 21), tile=10, k=3)
+
+    def test_margin_wider_than_tile(self):
+        self.assert_matches_sequential(30, 15, (15, 15), tile=4, k=6)
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            self.blocked_grid(20, 5, None, tile=0, k=2)
+
+class TimeTiledHubTest(unittest.TestCase):
+    """
+    Modo de halos via Master com `time_tile` = K > 1 (K passos por troca, halos de K linhas):
+    a grade final deve ser a mesma do sequencial também nos casos de borda do particionamento.
+    """
+    def assert_matches_sequential(self, grid_size, num_iterations, hotspot_pos, num_workers, time_tile):
+        grid, master = distributed_grid(grid_size, num_iterations, hotspot_pos, num_workers,
+                                        use_shared_memory=False, time_tile=time_tile)
+        self.assertIsNotNone(grid)
+        np.testing.assert_allclose(grid, sequential_grid(grid_size, num_iterations, hotspot_pos), rtol=0, atol=ATOL)
+        return master
+
+    def test_k_capped_by_small_sub_grids(self):
+        # 10 linhas internas entre 3 workers: sub-grades de 3 ou 4 linhas, então K = 8 é limitado a 3.
+        master = self.assert_matches_sequential(12, 12, (6, 5), 3, time_tile=8)
+        self.assertEqual(master.time_tile, 3)
+
+    def test_hotspot_in_neighbour_halo(self):
+        # Linhas [1:14], [14:27], [27:39]: o hotspot na linha 14 é do worker 1, mas fica dentro do
+        # halo inferior (K = 4 linhas) do worker 0, que precisa fixá-lo ao calcular essas linhas.
+        master = self.assert_matches_sequential(40, 16, (14, 13), 3, time_tile=4)
+        self.assertIsNone(master.worker_info[0]["hotspot_pos_relative"])
+        self.assertIsNotNone(master.worker_info[0]["hotspot_pos_tile"])
+
+    def test_remainder_round(self):
+        # 23 passos com K = 4: 5 trocas de 4 passos e uma última de 3.
+        master = self.assert_matches_sequential(40, 23, (20, 13), 3, time_tile=4)
+        self.assertEqual(master._round_steps[-1], 3)
+        self.assertEqual(sum(master._round_steps), 23)
+
+    def test_single_step_exchanges(self):
+        self.assert_matches_sequential(40, 10, (20, 13), 3, time_tile=1)
+
+class PeerExchangeTest(unittest.TestCase):
+    """Modo `peer_exchange`: os workers trocam halos diretamente entre si, sem passar pelo Master."""
+    def test_matches_sequential(self):
+        # O hotspot na primeira linha do worker 1 (linhas [14:27]) é halo do worker 0 a cada troca.
+        grid, master = distributed_grid(40, 20, (14, 13), 3, use_shared_memory=False, peer_exchange=True)
+        self.assertTrue(master.peer_exchange)
+        np.testing.assert_allclose(grid, sequential_grid(40, 20, (14, 13)), rtol=0, atol=ATOL)
+
+    def test_uneven_rows(self):
+        # 37 linhas internas entre 4 workers (10, 9, 9, 9).
+        grid, _ = distributed_grid(39, 15, (20, 30), 4, use_shared_memory=False, peer_exchange=True)
+        np.testing.assert_allclose(grid, sequential_grid(39, 15, (20, 30)), rtol=0, atol=ATOL)
+
+class SharedMemoryTest(unittest.TestCase):
+    """Modo de memória compartilhada: os workers calculam suas linhas direto nas grades globais do Master."""
+    def test_matches_sequential(self):
+        grid, master = distributed_grid(40, 20, (14, 13), 3, use_shared_memory=True)
+        self.assertTrue(master.use_shared_memory)
+        np.testing.assert_allclose(grid, sequential_grid(40, 20, (14, 13)), rtol=0, atol=ATOL)
+        # A grade devolvida é uma cópia privada: o bloco compartilhado já foi liberado.
+        self.assertIsNone(master._shm)
+        self.assertTrue(grid.flags['OWNDATA'])
+
+    def test_default_on_localhost(self):
+        # Em localhost, a memória compartilhada é o padrão e desativa o peer_exchange.
+        grid, master = distributed_grid(30, 9, (15, 10), 2, peer_exchange=True)
+        self.assertTrue(master.use_shared_memory)
+        self.assertFalse(master.peer_exchange)
+        np.testing.assert_allclose(grid, sequential_grid(30, 9, (15, 10)), rtol=0, atol=ATOL)
+
+if __name__ == "__main__":
+    unittest.main()